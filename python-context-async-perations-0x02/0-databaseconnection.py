@@ -1,36 +1,163 @@
 """
 Implements a custom class-based context manager to handle opening
 and closing SQLite database connections automatically.
+
+Connections come from a per-database `ConnectionPool`, so consecutive
+`with` blocks reuse an open connection (and SQLite's page cache) instead of
+reconnecting every time.
+
+For many small writes, `BatchWriter` queues statements to a background
+thread that commits them in groups, so a burst of writes shares one
+transaction (and one fsync) instead of paying for one each.
 """
 
+import time
+import queue
+import atexit
+import weakref
 import sqlite3
 import logging
+import threading
 import traceback
+from collections import deque
+from concurrent.futures import Future
 from sqlite3 import Connection, Cursor
-from typing import Optional, Type
-from pathlib import Path
-from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Type
 
-# -------------------------------
-# Configure logger
-# -------------------------------
+from logging_config import configure
+
+logger = logging.getLogger(__name__)
 
-today_str = datetime.now().strftime("%Y-%m-%d")
-LOG_DIR = Path("logs") / today_str
-LOG_DIR.mkdir(exist_ok=True)
 
-LOG_FILE = LOG_DIR / "db_connection.log"
+# -------------------------------------
+# Connection pool
+# -------------------------------------
+class ConnectionPool:
+    """
+    Keeps idle SQLite connections to one database for reuse.
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-    ],
-)
+    Args:
+        db_name (str): Database file the pool connects to.
+        max_size (int): Most idle connections kept; extras are closed.
+        idle_timeout (float): Seconds an idle connection may wait before
+            it is closed instead of reused.
+        warmup (int): Connections opened up front, so the first blocks
+            do not pay for connecting.
 
-logger = logging.getLogger(__name__)
+    Once closed, `acquire` raises and `release` closes the connection.
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        max_size: int = 5,
+        idle_timeout: float = 300.0,
+        warmup: int = 0,
+    ) -> None:
+        self.db_name = db_name
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.discarded = 0
+        # (connection, time it became idle); most recently used on the right
+        self._idle: Deque[Tuple[Connection, float]] = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(min(warmup, max_size)):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self) -> Connection:
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        # Load the schema now rather than on the first real query
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        return conn
+
+    def acquire(self) -> Connection:
+        """Return an idle connection, or open a new one."""
+        stale = []
+        conn = None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"connection pool for {self.db_name} is closed")
+            now = time.monotonic()
+            while self._idle:
+                candidate, idle_since = self._idle.pop()
+                if now - idle_since <= self.idle_timeout:
+                    conn = candidate
+                    self.hits += 1
+                    break
+                stale.append(candidate)
+                self.expired += 1
+            else:
+                self.misses += 1
+        for old in stale:
+            old.close()
+        return conn if conn is not None else self._connect()
+
+    def release(self, conn: Connection) -> None:
+        """Reset `conn` and keep it for reuse, or close it if the pool is full."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            with self._lock:
+                self.discarded += 1
+            conn.close()
+            return
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_size:
+                self._idle.append((conn, time.monotonic()))
+                return
+            self.discarded += 1
+        conn.close()
+
+    def close(self) -> None:
+        """Close every idle connection and refuse further checkouts."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, deque()
+        for conn, _ in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current idle count."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "discarded": self.discarded,
+                "idle": len(self._idle),
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name: str) -> ConnectionPool:
+    """Return the pool for `db_name`, creating one with defaults if needed."""
+    with _pools_lock:
+        pool = _pools.get(db_name)
+        if pool is None:
+            pool = _pools[db_name] = ConnectionPool(db_name)
+        return pool
+
+
+def configure_pool(
+    db_name: str, max_size: int = 5, idle_timeout: float = 300.0, warmup: int = 0
+) -> ConnectionPool:
+    """Create (or replace) the pool for `db_name` with the given settings."""
+    pool = ConnectionPool(db_name, max_size, idle_timeout, warmup)
+    with _pools_lock:
+        old = _pools.get(db_name)
+        _pools[db_name] = pool
+    if old is not None:
+        old.close()
+    return pool
 
 
 # -------------------------------------
@@ -45,16 +172,31 @@ class DatabaseConnection:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM users")
             results = cursor.fetchall()
+
+    Args:
+        db_name (str): Database file to connect to.
+        pooled (bool): Borrow from the database's pool (default) instead of
+            opening and closing a dedicated connection. The pool is looked
+            up on every `with`, so `configure_pool` applies to existing
+            instances too.
     """
 
-    def __init__(self, db_name: str) -> None:
+    def __init__(self, db_name: str, pooled: bool = True) -> None:
         self.db_name = db_name
+        self.pooled = pooled
+        # Pool the current connection was borrowed from, until it is returned
+        self.pool: Optional[ConnectionPool] = None
         self.conn: Optional[Connection] = None
 
     def __enter__(self) -> Connection:
         """Establish and return the database connection."""
-        self.conn = sqlite3.connect(self.db_name)
-        logger.info(f"Opened connection to database: {self.db_name}")
+        if self.pooled:
+            self.pool = get_pool(self.db_name)
+            self.conn = self.pool.acquire()
+            logger.info(f"Borrowed pooled connection to database: {self.db_name}")
+        else:
+            self.conn = sqlite3.connect(self.db_name)
+            logger.info(f"Opened connection to database: {self.db_name}")
         return self.conn
 
     def __exit__(
@@ -76,14 +218,236 @@ class DatabaseConnection:
             else:
                 self.conn.commit()
                 logger.info("Transaction committed successfully.")
-            self.conn.close()
-            logger.info(f"Closed connection to database: {self.db_name}")
+            if self.pool is not None:
+                self.pool.release(self.conn)
+                logger.info(f"Returned connection to pool: {self.db_name}")
+            else:
+                self.conn.close()
+                logger.info(f"Closed connection to database: {self.db_name}")
+            self.conn = None
+            self.pool = None
+
+
+# -------------------------------------
+# Batched writes
+# -------------------------------------
+class BatchWriter:
+    """
+    Background writer that groups queued statements into transactions.
+
+    `write()` returns a `concurrent.futures.Future` that resolves to the
+    statement's rowcount once its transaction has committed (await it from
+    asyncio with `asyncio.wrap_future`). A batch commits when it holds
+    `max_batch` statements or its oldest statement has waited `max_latency`
+    seconds, whichever comes first. Each statement runs under its own
+    savepoint, so a failing one only fails its own future. Writers still
+    open at interpreter exit are closed, so queued statements commit.
+
+    Example:
+        with BatchWriter("users.db") as writer:
+            futures = [
+                writer.write("UPDATE users SET age = age + 1 WHERE id = ?", (i,))
+                for i in range(1, 1001)
+            ]
+        # leaving the block flushes; every future is now resolved
+
+    Args:
+        db_name (str): Database file to write to.
+        max_batch (int): Most statements committed in one transaction.
+        max_latency (float): Longest a queued statement waits for its batch
+            to fill before the batch is committed anyway.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self, db_name: str, max_batch: int = 1000, max_latency: float = 0.005
+    ) -> None:
+        self.db_name = db_name
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.batches = 0
+        self.statements = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        # Guards _closed together with every put, so nothing lands after _STOP
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._run, name=f"batch-writer:{db_name}", daemon=True
+        )
+        self._thread.start()
+        _open_writers.add(self)
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        """True once `close()` was called or the writer thread died."""
+        with self._lock:
+            return self._closed
+
+    def write(self, query: str, params: Sequence[Any] = ()) -> "Future[int]":
+        """Queue one statement; the future resolves after it commits."""
+        return self._submit(query, params, many=False)
+
+    def writemany(
+        self, query: str, seq_of_params: Iterable[Sequence[Any]]
+    ) -> "Future[int]":
+        """Queue an `executemany`; it commits with the rest of its batch."""
+        return self._submit(query, list(seq_of_params), many=True)
+
+    def _put(self, item: Any) -> None:
+        """Queue `item` with its enqueue time, raising if the writer is closed."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("writer is closed") from self._error
+            self._queue.put((time.monotonic(), item))
+
+    def _submit(self, query: str, params: Any, many: bool) -> "Future[int]":
+        future: "Future[int]" = Future()
+        self._put((query, params, many, future))
+        return future
+
+    def flush(self) -> None:
+        """Block until everything queued so far has committed (or failed)."""
+        marker: "Future[int]" = Future()
+        self._put(marker)
+        marker.result()
+
+    def close(self) -> None:
+        """Commit what is queued, then stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put((time.monotonic(), self._STOP))
+        self._thread.join()
+        logger.info(
+            f"Batch writer for {self.db_name} committed {self.statements} "
+            f"statements in {self.batches} transactions"
+        )
+
+    # ---- writer thread ----------------------------------------------
+    def _run(self) -> None:
+        batch: List[Any] = []
+        conn: Optional[Connection] = None
+        try:
+            conn = sqlite3.connect(self.db_name, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA busy_timeout = 5000")
+            stopping = False
+            while not stopping:
+                # Latency counts from when the oldest item was queued, which
+                # may have been while the previous batch was committing
+                queued_at, first = self._queue.get()
+                batch = [first]
+                deadline = queued_at + self.max_latency
+                while len(batch) < self.max_batch:
+                    timeout = deadline - time.monotonic()
+                    try:
+                        _, item = self._queue.get(timeout=max(0.0, timeout))
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                markers = [item for item in batch if isinstance(item, Future)]
+                stopping = any(item is self._STOP for item in batch)
+                writes = [item for item in batch if isinstance(item, tuple)]
+                if writes:
+                    self._commit(conn, writes)
+                for marker in markers:
+                    marker.set_result(0)
+        except Exception as e:
+            logger.exception(f"Batch writer for {self.db_name} stopped")
+            self._fail_pending(batch, e)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _fail_pending(self, batch: List[Any], error: Exception) -> None:
+        """Close the writer and fail every unresolved future with `error`."""
+        with self._lock:
+            self._closed = True
+            self._error = error
+        pending = list(batch)
+        while True:
+            try:
+                pending.append(self._queue.get_nowait()[1])
+            except queue.Empty:
+                break
+        for item in pending:
+            future = item[-1] if isinstance(item, tuple) else item
+            if isinstance(future, Future) and not future.done():
+                future.set_exception(error)
+
+    def _commit(self, conn: Connection, writes: List[Any]) -> None:
+        """Run `writes` in one transaction and resolve their futures."""
+        done: List[Tuple["Future[int]", int]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for query, params, many, future in writes:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write")
+                try:
+                    if many:
+                        rowcount = conn.executemany(query, params).rowcount
+                    else:
+                        rowcount = conn.execute(query, params).rowcount
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    future.set_exception(e)
+                    continue
+                conn.execute("RELEASE write")
+                done.append((future, rowcount))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error(f"Batch of {len(writes)} writes failed: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for *_, future in writes:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.statements += len(done)
+        for future, rowcount in done:
+            future.set_result(rowcount)
+
+
+_writers: Dict[str, BatchWriter] = {}
+
+# Every writer not yet garbage collected, closed by _close_writers at exit
+_open_writers: "weakref.WeakSet[BatchWriter]" = weakref.WeakSet()
+
+
+def get_writer(db_name: str) -> BatchWriter:
+    """Return the shared batch writer for `db_name`, starting one if needed."""
+    with _pools_lock:
+        writer = _writers.get(db_name)
+        if writer is None or writer.closed:
+            writer = _writers[db_name] = BatchWriter(db_name)
+        return writer
+
+
+@atexit.register
+def _close_writers() -> None:
+    """Commit whatever is still queued before the daemon threads are killed."""
+    for writer in list(_open_writers):
+        writer.close()
 
 
 # -------------------------------------
 # Usage
 # -------------------------------------
 if __name__ == "__main__":
+    configure("db_connection.log")
+    configure_pool("users.db", max_size=4, idle_timeout=60.0, warmup=1)
     with DatabaseConnection("users.db") as conn:
         cursor: Cursor = conn.cursor()
         cursor.execute("SELECT * FROM users")
@@ -91,6 +455,19 @@ if __name__ == "__main__":
         for row in results:
             print(row)
 
+    # The second block reuses the warm connection
+    with DatabaseConnection("users.db") as conn:
+        conn.execute("SELECT COUNT(*) FROM users").fetchone()
+    print(get_pool("users.db").stats())
+
+    # Many small writes share transactions instead of committing one by one
+    with BatchWriter("users.db") as writer:
+        futures = [
+            writer.write("UPDATE users SET age = age WHERE id = ?", (i,))
+            for i in range(1, 101)
+        ]
+    print(sum(f.result() for f in futures), "rows written")
+
 # Sample Output
 # 2025-11-09 03:34:15,076 [INFO] Opened connection to database: users.db
 # (1, 'Alice Johnson', 'Crawford_Cartwright@hotmail.com', '2025-11-08 18:59:14')
@@ -1,37 +1,130 @@
 """
 Implements a reusable class-based context manager `ExecuteQuery`
 that manages database connections and executes parameterized queries.
+
+With `stream=True` the block receives an iterator over the rows, fetched
+`arraysize` at a time, and the connection is closed as soon as the
+iterator is exhausted (or when the block exits, whichever comes first).
+
+Instrumentation is optional: pass `sink=` (or install one for every query
+with `set_query_sink`) and each query reports a `QueryStats` with separate
+connect, execute and fetch timings, its row count and result size, and for
+queries slower than `slow_seconds`, SQLite's `EXPLAIN QUERY PLAN`. Without a
+sink none of this is measured.
 """
 
+import sys
+import time
 import sqlite3
 import logging
 import traceback
 from sqlite3 import Connection, Cursor
-from typing import Any, Optional, Sequence, Type, List, Tuple
-from pathlib import Path
-from datetime import datetime
-
-# -------------------------------
-# Configure logger
-# -------------------------------
-
-today_str = datetime.now().strftime("%Y-%m-%d")
-LOG_DIR = Path("logs") / today_str
-LOG_DIR.mkdir(exist_ok=True)
-
-LOG_FILE = LOG_DIR / "db_query.log"
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-    ],
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    Sequence,
+    Type,
+    List,
+    Tuple,
+    Union,
 )
 
+from logging_config import configure
+
 logger = logging.getLogger(__name__)
 
+Row = Tuple[Any, ...]
+
+# Rows per fetchmany() call in streaming mode
+DEFAULT_ARRAYSIZE = 1000
+
+# Instrumented queries slower than this (execute + fetch) get their plan captured
+SLOW_QUERY_SECONDS = 0.1
+
+
+# -------------------------------------
+# Instrumentation
+# -------------------------------------
+class QueryStats:
+    """
+    Measurements for one `ExecuteQuery` block.
+
+    SQLite prepares a statement inside `cursor.execute()`, so preparation
+    is included in `execute_seconds` rather than timed on its own.
+    """
+
+    def __init__(self, db_name: str, query: str, params: Optional[Sequence[Any]]):
+        self.db_name = db_name
+        self.query = query
+        self.params = params
+        self.connect_seconds = 0.0
+        self.execute_seconds = 0.0
+        self.fetch_seconds = 0.0
+        self.rows = 0
+        self.nbytes = 0
+        self.plan: Optional[List[str]] = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def total_seconds(self) -> float:
+        return self.connect_seconds + self.execute_seconds + self.fetch_seconds
+
+    @property
+    def full_scans(self) -> List[str]:
+        """
+        Plan steps that scan a whole table (empty if no plan was captured).
+
+        `SCAN ... USING [COVERING] INDEX` reads an index, not the table, so
+        it is not flagged; this matches `index_advisor`'s scan detection.
+        """
+        return [
+            step
+            for step in self.plan or ()
+            if step.split()[:1] == ["SCAN"] and "USING" not in step.split()
+        ]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "db": self.db_name,
+            "query": self.query,
+            "connect_ms": round(self.connect_seconds * 1000, 3),
+            "execute_ms": round(self.execute_seconds * 1000, 3),
+            "fetch_ms": round(self.fetch_seconds * 1000, 3),
+            "rows": self.rows,
+            "bytes": self.nbytes,
+            "plan": self.plan,
+            "error": repr(self.error) if self.error else None,
+        }
+
+
+QuerySink = Callable[[QueryStats], None]
+
+_sink: Optional[QuerySink] = None
+
+
+def set_query_sink(sink: Optional[QuerySink]) -> None:
+    """Install (or with None, remove) the sink used by every `ExecuteQuery`."""
+    global _sink
+    _sink = sink
+
+
+def logging_sink(stats: QueryStats) -> None:
+    """Sink that logs each query's stats, warning on full table scans."""
+    logger.info(f"Query stats: {stats.as_dict()}")
+    for step in stats.full_scans:
+        logger.warning(f"Full scan ({step}) in slow query: {stats.query}")
+
+
+def rows_nbytes(rows: Sequence[Row]) -> int:
+    """Approximate memory held by `rows`: the tuples plus their values."""
+    return sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+        for row in rows
+    )
+
 
 # -------------------------------------
 # Reusable Context Manager Class
@@ -44,38 +137,167 @@ class ExecuteQuery:
         with ExecuteQuery("users.db", "SELECT * FROM users WHERE age > ?", (25,)) as results:
             for row in results:
                 print(row)
+
+        # constant memory for large results
+        with ExecuteQuery("users.db", "SELECT * FROM users", stream=True) as rows:
+            for row in rows:
+                print(row)
+
+        # timings, size and (if slow) the query plan, sent to a sink
+        with ExecuteQuery("users.db", "SELECT * FROM users", sink=logging_sink) as rows:
+            ...
+
+    Args:
+        db_name (str): Database file to connect to.
+        query (str): SQL to execute.
+        params (Optional[Sequence[Any]]): Query parameters.
+        stream (bool): Return a row iterator instead of a list.
+        arraysize (int): Rows per `fetchmany` call when streaming.
+        sink (Optional[QuerySink]): Receives this query's `QueryStats`;
+            defaults to the sink installed with `set_query_sink`.
+        slow_seconds (float): Capture `EXPLAIN QUERY PLAN` when execute
+            plus fetch take at least this long.
     """
 
     def __init__(
-        self, db_name: str, query: str, params: Optional[Sequence[Any]] = None
+        self,
+        db_name: str,
+        query: str,
+        params: Optional[Sequence[Any]] = None,
+        *,
+        stream: bool = False,
+        arraysize: int = DEFAULT_ARRAYSIZE,
+        sink: Optional[QuerySink] = None,
+        slow_seconds: float = SLOW_QUERY_SECONDS,
     ) -> None:
         self.db_name = db_name
         self.query = query
         self.params = params
+        self.stream = stream
+        self.arraysize = arraysize
+        self.sink = sink or _sink
+        self.slow_seconds = slow_seconds
         self.conn: Optional[Connection] = None
         self.cursor: Optional[Cursor] = None
-        self.results: List[Tuple[Any, ...]] = []
+        self.results: List[Row] = []
+        self.stats: Optional[QueryStats] = None
+        self._reported = False
+        self._rows: Optional[Iterator[Row]] = None
 
-    def __enter__(self) -> List[Tuple[Any, ...]]:
+    def __enter__(self) -> Union[List[Row], Iterator[Row]]:
         """Open the connection, execute the query, and return the results."""
+        stats = self.stats = (
+            QueryStats(self.db_name, self.query, self.params) if self.sink else None
+        )
+        self._reported = False
         try:
+            started = time.perf_counter()
             self.conn = sqlite3.connect(self.db_name)
             self.cursor = self.conn.cursor()
+            self.cursor.arraysize = self.arraysize
             logger.info(f"Connected to database: {self.db_name}")
 
+            if stats is not None:
+                now = time.perf_counter()
+                stats.connect_seconds = now - started
+                started = now
             if self.params:
                 self.cursor.execute(self.query, self.params)
             else:
                 self.cursor.execute(self.query)
+            if stats is not None:
+                now = time.perf_counter()
+                stats.execute_seconds = now - started
+                started = now
+            logger.info(f"Executed query: {self.query} | Params: {self.params}")
+
+            if self.stream:
+                self._rows = self._iter_rows()
+                return self._rows
 
             self.results = self.cursor.fetchall()
-            logger.info(f"Executed query: {self.query} | Params: {self.params}")
+            if stats is not None:
+                stats.fetch_seconds = time.perf_counter() - started
+                stats.rows = len(self.results)
+                stats.nbytes = rows_nbytes(self.results)
             return self.results
 
         except sqlite3.Error as e:
             logger.error(f"Database error: {e}")
+            if stats is not None:
+                stats.error = e
+                self._report()
+            if self.conn:
+                self.conn.close()
+                self.conn = None
             raise
 
+    def _iter_rows(self) -> Iterator[Row]:
+        """Yield rows chunk by chunk, closing the connection once drained."""
+        cursor = self.cursor
+        assert cursor is not None
+        stats = self.stats
+        count = 0
+        while True:
+            if stats is not None:
+                started = time.perf_counter()
+                rows = cursor.fetchmany()
+                stats.fetch_seconds += time.perf_counter() - started
+                stats.rows += len(rows)
+                stats.nbytes += rows_nbytes(rows)
+            else:
+                rows = cursor.fetchmany()
+            if not rows:
+                break
+            count += len(rows)
+            yield from rows
+        logger.info(f"Streamed {count} rows")
+        self._close(commit=True)
+
+    def _explain(self) -> Optional[List[str]]:
+        """Return the plan steps for this query, or None if it cannot be explained."""
+        assert self.conn is not None
+        try:
+            plan = self.conn.execute(
+                f"EXPLAIN QUERY PLAN {self.query}", self.params or ()
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not explain query: {e}")
+            return None
+        return [detail for *_, detail in plan]
+
+    def _report(self) -> None:
+        """Send this query's stats to the sink, once."""
+        stats = self.stats
+        if stats is None or self.sink is None or self._reported:
+            return
+        self._reported = True
+        if (
+            stats.error is None
+            and self.conn is not None
+            and stats.execute_seconds + stats.fetch_seconds >= self.slow_seconds
+        ):
+            stats.plan = self._explain()
+        try:
+            self.sink(stats)
+        except Exception:
+            logger.exception("Query sink failed")
+
+    def _close(self, commit: bool) -> None:
+        """Commit or roll back, then close the connection (idempotent)."""
+        if self.conn is None:
+            return
+        self._report()
+        if commit:
+            self.conn.commit()
+            logger.info("Transaction committed successfully.")
+        else:
+            self.conn.rollback()
+        self.conn.close()
+        self.conn = None
+        self.cursor = None
+        logger.info(f"Closed connection to database: {self.db_name}")
+
     def __exit__(
         self,
         exc_type: Optional[Type[BaseException]],
@@ -85,27 +307,31 @@ class ExecuteQuery:
         """Ensure proper cleanup and commit/rollback management."""
         if self.conn:
             if exc_type:
-                self.conn.rollback()
                 logger.error(
                     f"Transaction rolled back due to: {exc_type.__name__}: {exc_val}"
                 )
                 # Format the traceback into a readable string
                 formatted_tb = "".join(traceback.format_tb(exc_tb))
                 logger.error("Traceback:\n%s", formatted_tb)
-            else:
-                self.conn.commit()
-                logger.info("Transaction committed successfully.")
-            self.conn.close()
-            logger.info(f"Closed connection to database: {self.db_name}")
+            self._close(commit=exc_type is None)
+        self._rows = None
 
 
 # -------------------------------------
 # Usage
 # -------------------------------------
 if __name__ == "__main__":
+    configure("db_query.log")
     query = "SELECT * FROM users WHERE age > ?"
     params = (25,)
 
     with ExecuteQuery("users.db", query, params) as results:
         for row in results:
             print(row)
+
+    with ExecuteQuery("users.db", query, params, stream=True, arraysize=500) as rows:
+        print(sum(1 for _ in rows), "rows streamed")
+
+    # Report timings, size and (when slow) the plan for this query
+    with ExecuteQuery("users.db", query, params, sink=logging_sink) as results:
+        print(len(results), "rows fetched")
@@ -5,9 +5,21 @@ Requires:
     uv add aiosqlite
 
 This script defines:
+- iter_user_batches(): async generator over `fetchmany` batches of a query
 - async_fetch_users(): fetch all users
 - async_fetch_older_users(): fetch users older than 40
-- fetch_concurrently(): run both concurrently with asyncio.gather
+- fetch_concurrently(): run both through a bounded `QueryScheduler`
+
+Both fetchers accept an optional `AsyncSQLitePool`; with one, they borrow
+a pooled connection instead of opening (and spawning a thread for) their
+own, so concurrency is bounded by the pool size rather than by coroutines.
+
+`iter_user_batches` awaits once per batch instead of once per row and never
+holds more than one batch, so callers can stream and aggregate a large table
+in constant memory:
+
+    async for batch in iter_user_batches("SELECT age FROM users"):
+        total += sum(age for (age,) in batch)
 """
 
 from __future__ import annotations
@@ -15,36 +27,64 @@ from __future__ import annotations
 import asyncio
 import logging
 import aiosqlite
+import contextlib
 from pathlib import Path
-from datetime import datetime
-from typing import List
+from typing import Any, AsyncIterator, List, Optional, Sequence
 from aiosqlite import Row  # a single DB row (tuple of columns)
 
+from async_pool import AsyncSQLitePool
+from query_scheduler import QueryScheduler
+from logging_config import configure
+
 DB_PATH = Path("users.db")
 
-# -------------------------------
-# Configure logger
-# -------------------------------
+# Rows per fetchmany() call when iterating in batches
+DEFAULT_BATCH_SIZE = 1000
 
-today_str = datetime.now().strftime("%Y-%m-%d")
-LOG_DIR = Path("logs") / today_str
-LOG_DIR.mkdir(exist_ok=True)
+logger = logging.getLogger(__name__)
 
-LOG_FILE = LOG_DIR / "concurrent.log"
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-    ],
-)
+@contextlib.asynccontextmanager
+async def _connect(
+    pool: Optional[AsyncSQLitePool],
+) -> AsyncIterator[aiosqlite.Connection]:
+    """Borrow from `pool` when given, else open a dedicated connection."""
+    if pool is not None:
+        async with pool.connection() as db:
+            yield db
+    else:
+        async with aiosqlite.connect(DB_PATH) as db:
+            yield db
 
-logger = logging.getLogger(__name__)
 
+async def iter_user_batches(
+    query: str = "SELECT * FROM users",
+    params: Sequence[Any] = (),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    pool: Optional[AsyncSQLitePool] = None,
+) -> AsyncIterator[List[Row]]:
+    """
+    Yield the rows of `query` in lists of up to `batch_size`.
 
-async def async_fetch_users() -> List[Row]:
+    Args:
+        query (str): SQL to run.
+        params (Sequence[Any]): Query parameters.
+        batch_size (int): Rows per `fetchmany` call (one thread hop each).
+        pool (Optional[AsyncSQLitePool]): Pool to borrow the connection from.
+    """
+    async with _connect(pool) as db:
+        async with db.execute(query, params) as cursor:
+            while True:
+                batch = await cursor.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield list(batch)
+
+
+async def async_fetch_users(
+    pool: Optional[AsyncSQLitePool] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> List[Row]:
     """
     Asynchronously fetch all users from the database.
     Returns list of rows.
@@ -52,11 +92,8 @@ async def async_fetch_users() -> List[Row]:
     logger.info("Starting async_fetch_users")
     rows: List[Row] = []
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            # return rows as tuples (default)
-            async with db.execute("SELECT * FROM users") as cursor:
-                async for row in cursor:
-                    rows.append(row)
+        async for batch in iter_user_batches(batch_size=batch_size, pool=pool):
+            rows.extend(batch)
     except Exception as exc:
         logger.exception("Error in async_fetch_users: %s", exc)
         raise
@@ -64,7 +101,9 @@ async def async_fetch_users() -> List[Row]:
     return rows
 
 
-async def async_fetch_older_users() -> List[Row]:
+async def async_fetch_older_users(
+    pool: Optional[AsyncSQLitePool] = None,
+) -> List[Row]:
     """
     Asynchronously fetch users older than `min_age`.
     Returns list of rows.
@@ -73,12 +112,10 @@ async def async_fetch_older_users() -> List[Row]:
     logger.info("Starting async_fetch_older_users (min_age=%d)", min_age)
     rows: List[Row] = []
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute(
-                "SELECT * FROM users WHERE age > ?", (min_age,)
-            ) as cursor:
-                async for row in cursor:
-                    rows.append(row)
+        async for batch in iter_user_batches(
+            "SELECT * FROM users WHERE age > ?", (min_age,), pool=pool
+        ):
+            rows.extend(batch)
     except Exception as exc:
         logger.exception("Error in async_fetch_older_users: %s", exc)
         raise
@@ -86,20 +123,37 @@ async def async_fetch_older_users() -> List[Row]:
     return rows
 
 
-async def fetch_concurrently() -> None:
+async def fetch_concurrently(
+    max_in_flight: int = 2,
+    timeout: Optional[float] = 30.0,
+    cancel_on_failure: bool = True,
+) -> None:
     """
     Run async_fetch_users and async_fetch_older_users concurrently and print results.
-    """
-    logger.info("Running queries concurrently with asyncio.gather")
-    # run both coroutines concurrently
-    users_task = async_fetch_users()
-    older_users_task = async_fetch_older_users()
 
-    try:
-        users, older_users = await asyncio.gather(users_task, older_users_task)
-    except Exception:
-        logger.exception("One or more concurrent tasks failed")
-        raise
+    Args:
+        max_in_flight (int): Most queries running against the database at once.
+        timeout (Optional[float]): Seconds each query may run once started.
+        cancel_on_failure (bool): Abandon the other query if one fails.
+    """
+    logger.info("Running queries concurrently (max_in_flight=%d)", max_in_flight)
+    async with AsyncSQLitePool(DB_PATH, max_size=max_in_flight) as pool:
+        scheduler = QueryScheduler(max_in_flight, cancel_on_failure=cancel_on_failure)
+        db = str(DB_PATH)
+        scheduler.submit(async_fetch_users, pool, db=db, priority=1, timeout=timeout)
+        scheduler.submit(
+            async_fetch_older_users, pool, db=db, priority=0, timeout=timeout
+        )
+
+        try:
+            users, older_users = await scheduler.gather()
+        except Exception:
+            logger.exception("One or more concurrent tasks failed")
+            raise
+        finally:
+            for entry in scheduler.report():
+                logger.info("Task report: %s", entry)
+        logger.info("Pool stats: %s", pool.stats())
 
     # Print summary and (optionally) a few rows for verification
     logger.info("Total users fetched: %d", len(users))
@@ -115,5 +169,6 @@ async def fetch_concurrently() -> None:
 
 
 if __name__ == "__main__":
+    configure("concurrent.log")
     # Run the concurrent fetch
     asyncio.run(fetch_concurrently())
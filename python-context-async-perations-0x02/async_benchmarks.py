@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the async read paths.
+
+Reads every row of `users` and reports rows per second (best of several
+repeats) for:
+
+- aiosqlite, `async for row in cursor` (as in 3-concurrent.py),
+- aiosqlite, `fetchmany` batches,
+- `iter_user_batches` from 3-concurrent.py, summing ages as it streams,
+- `async_fetch_users` from 3-concurrent.py, materializing every row,
+- `ExecutorEngine.fetchall`,
+- `ExecutorEngine.batches`.
+
+Without `--db`, a temporary database is seeded with `--rows` users. With
+`--memory`, each case runs once more under `tracemalloc` to report its
+peak Python memory.
+
+Usage:
+    python async_benchmarks.py
+    python async_benchmarks.py --rows 1000000 --batch-size 2000 --json bench.json
+    python async_benchmarks.py --memory
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import importlib.util
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiosqlite
+
+from async_pool import AsyncSQLitePool
+from executor_engine import DEFAULT_BATCH_SIZE, ExecutorEngine
+
+HERE = Path(__file__).resolve().parent
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_REPEAT = 3
+
+QUERY = "SELECT * FROM users"
+
+
+def load_task(filename: str) -> Any:
+    """Import a task module whose file name is not a valid identifier."""
+    name = Path(filename).stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, HERE / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+concurrent = load_task("3-concurrent.py")
+
+
+def seed_users(db_path: str, rows: int) -> None:
+    """Create and fill a `users` table shaped like the project's."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INT)"
+    )
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+            ((f"User {n}", f"user{n}@example.com", 18 + n % 80) for n in range(rows)),
+        )
+    conn.close()
+
+
+# -------------------------------
+# Benchmark cases
+# -------------------------------
+async def aiosqlite_rows(db_path: str, batch_size: int) -> int:
+    count = 0
+    async with aiosqlite.connect(db_path) as db:
+        async with db.execute(QUERY) as cursor:
+            async for _ in cursor:
+                count += 1
+    return count
+
+
+async def aiosqlite_batches(db_path: str, batch_size: int) -> int:
+    count = 0
+    async with aiosqlite.connect(db_path) as db:
+        async with db.execute(QUERY) as cursor:
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                count += len(rows)
+    return count
+
+
+async def engine_fetchall(db_path: str, batch_size: int) -> int:
+    async with ExecutorEngine(db_path, max_workers=1) as engine:
+        return len(await engine.fetchall(QUERY, batch_size=batch_size))
+
+
+async def engine_batches(db_path: str, batch_size: int) -> int:
+    count = 0
+    async with ExecutorEngine(db_path, max_workers=1) as engine:
+        async for rows in engine.batches(QUERY, batch_size=batch_size):
+            count += len(rows)
+    return count
+
+
+async def stream_user_batches(db_path: str, batch_size: int) -> int:
+    count = 0
+    total_age = 0
+    async with AsyncSQLitePool(db_path, max_size=1) as pool:
+        async for rows in concurrent.iter_user_batches(
+            batch_size=batch_size, pool=pool
+        ):
+            count += len(rows)
+            total_age += sum(row[3] for row in rows)
+    return count
+
+
+async def fetch_users_list(db_path: str, batch_size: int) -> int:
+    async with AsyncSQLitePool(db_path, max_size=1) as pool:
+        return len(await concurrent.async_fetch_users(pool, batch_size))
+
+
+CASES: Dict[str, Callable[[str, int], Awaitable[int]]] = {
+    "aiosqlite per-row": aiosqlite_rows,
+    "aiosqlite fetchmany": aiosqlite_batches,
+    "iter_user_batches": stream_user_batches,
+    "async_fetch_users": fetch_users_list,
+    "engine fetchall": engine_fetchall,
+    "engine batches": engine_batches,
+}
+
+
+async def time_case(
+    case: Callable[[str, int], Awaitable[int]],
+    db_path: str,
+    batch_size: int,
+    repeat: int,
+) -> Dict[str, Any]:
+    """Return the best of `repeat` runs as seconds and rows per second."""
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = await case(db_path, batch_size)
+        best = min(best, time.perf_counter() - start)
+    return {"rows": rows, "seconds": best, "rows_per_sec": rows / best}
+
+
+async def peak_memory(
+    case: Callable[[str, int], Awaitable[int]], db_path: str, batch_size: int
+) -> int:
+    """Return the peak bytes `tracemalloc` sees during one run of `case`."""
+    tracemalloc.start()
+    try:
+        await case(db_path, batch_size)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def run(
+    db_path: str, batch_size: int, repeat: int, memory: bool = False
+) -> List[Dict[str, Any]]:
+    results = []
+    for name, case in CASES.items():
+        entry = await time_case(case, db_path, batch_size, repeat)
+        entry["case"] = name
+        if memory:
+            entry["peak_bytes"] = await peak_memory(case, db_path, batch_size)
+        results.append(entry)
+    return results
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    """Render results as an aligned text table."""
+    memory = any("peak_bytes" in r for r in results)
+    header = f"{'case':<22} {'rows':>10} {'seconds':>9} {'rows/sec':>12}"
+    if memory:
+        header += f" {'peak MiB':>9}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        line = (
+            f"{r['case']:<22} {r['rows']:>10} {r['seconds']:>9.3f} "
+            f"{r['rows_per_sec']:>12,.0f}"
+        )
+        if memory:
+            line += f" {r['peak_bytes'] / 2**20:>9.1f}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run every case and print (or save) the results."""
+    parser = argparse.ArgumentParser(description="Benchmark the async read paths.")
+    parser.add_argument("--db", help="existing database with a users table")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--memory", action="store_true", help="also report peak traced memory"
+    )
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(tmp, "users.db")
+            seed_users(db_path, args.rows)
+        results = asyncio.run(run(db_path, args.batch_size, args.repeat, args.memory))
+
+    print(format_table(results))
+    if args.json:
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "batch_size": args.batch_size,
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,159 @@
+"""
+Asyncio-native pool of aiosqlite connections.
+
+Every aiosqlite connection owns a background thread, so opening one per
+coroutine turns a gather of N queries into N threads. `AsyncSQLitePool`
+caps the number of connections (and threads) and hands them out fairly:
+waiters are served strictly first come, first served, and a released
+connection goes straight to the oldest waiter so a newcomer cannot barge in.
+
+Example:
+    async with AsyncSQLitePool("users.db", max_size=4) as pool:
+        async with pool.connection() as db:
+            async with db.execute("SELECT * FROM users") as cursor:
+                rows = await cursor.fetchall()
+"""
+
+from __future__ import annotations
+
+import time
+import asyncio
+import logging
+import contextlib
+from collections import deque
+from pathlib import Path
+from typing import AsyncIterator, Deque, Dict, List, Sequence, Union
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRAGMAS: Sequence[str] = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+class AsyncSQLitePool:
+    """
+    Bounded pool of aiosqlite connections with FIFO acquisition.
+
+    Args:
+        db_path (Union[str, Path]): Database file.
+        max_size (int): Most connections (and aiosqlite threads) open at once.
+        pragmas (Sequence[str]): Statements run on every new connection.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        max_size: int = 4,
+        pragmas: Sequence[str] = DEFAULT_PRAGMAS,
+    ) -> None:
+        self.db_path = db_path
+        self.max_size = max_size
+        self.pragmas = pragmas
+        self._idle: List[aiosqlite.Connection] = []
+        self._all: List[aiosqlite.Connection] = []
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._size = 0
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    async def __aenter__(self) -> "AsyncSQLitePool":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.db_path)
+        try:
+            for pragma in self.pragmas:
+                await conn.execute(pragma)
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
+
+    async def acquire(self) -> aiosqlite.Connection:
+        """Check out a connection, waiting in line if all are busy."""
+        if self._closed:
+            raise RuntimeError("pool is closed")
+        if self._idle and not self._waiters:
+            self.hits += 1
+            return self._idle.pop()
+        if self._size < self.max_size:
+            self.misses += 1
+            self._size += 1
+            try:
+                conn = await self._connect()
+            except BaseException:
+                self._size -= 1
+                raise
+            self._all.append(conn)
+            return conn
+
+        self.waits += 1
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a connection just as we were cancelled: pass it on
+                self.release(waiter.result())
+            else:
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+            raise
+        finally:
+            self.wait_seconds += time.perf_counter() - started
+
+    def release(self, conn: aiosqlite.Connection) -> None:
+        """Return a connection, giving it to the oldest waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(conn)
+                return
+        self._idle.append(conn)
+
+    @contextlib.asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a connection for the duration of the block."""
+        conn = await self.acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                await conn.rollback()
+            self.release(conn)
+
+    async def close(self) -> None:
+        """Close every connection; their aiosqlite threads exit with them."""
+        self._closed = True
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_exception(RuntimeError("pool closed"))
+        self._waiters.clear()
+        conns, self._all, self._idle = self._all, [], []
+        self._size = 0
+        for conn in conns:
+            await conn.close()
+
+    def stats(self) -> Dict[str, float]:
+        """Return checkout counters and the current pool size."""
+        return {
+            "size": self._size,
+            "idle": len(self._idle),
+            "waiting": len(self._waiters),
+            "hits": self.hits,
+            "misses": self.misses,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 6),
+        }
@@ -0,0 +1,295 @@
+"""
+Async SQLite engine backed by a shared thread pool.
+
+aiosqlite gives every connection its own thread and hands each row back
+to the event loop separately, so `async for row in cursor` costs one
+cross-thread hop per row. `ExecutorEngine` instead runs whole fetches on a
+shared `ThreadPoolExecutor`: each worker thread keeps its own sqlite3
+connection (thread-affine, via `threading.local`), reads with `fetchmany`,
+and returns rows to the loop a batch at a time.
+
+Example:
+    async with ExecutorEngine("users.db", max_workers=4) as engine:
+        rows = await engine.fetchall("SELECT * FROM users WHERE age > ?", (40,))
+        async for batch in engine.batches("SELECT * FROM users"):
+            total += len(batch)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import logging
+import threading
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+logger = logging.getLogger(__name__)
+
+Row = Tuple[Any, ...]
+
+# Rows per fetchmany() call, and per batch handed to the event loop
+DEFAULT_BATCH_SIZE = 1000
+
+# Batches a streaming fetch may run ahead of its consumer
+DEFAULT_PREFETCH = 4
+
+# Seconds a blocked producer waits between checks of its stop event
+STOP_POLL = 0.05
+
+DEFAULT_PRAGMAS: Sequence[str] = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+class ExecutorEngine:
+    """
+    Runs sqlite3 work on a shared thread pool with one connection per thread.
+
+    Args:
+        db_path (Union[str, Path]): Database file.
+        max_workers (int): Threads (and so connections) in the pool.
+        batch_size (int): Default rows per `fetchmany` batch.
+        pragmas (Sequence[str]): Statements run on every new connection.
+        row_factory (Optional[Callable]): sqlite3 row factory for connections.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        max_workers: int = 4,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        pragmas: Sequence[str] = DEFAULT_PRAGMAS,
+        row_factory: Optional[Callable[[sqlite3.Cursor, Row], Any]] = None,
+    ) -> None:
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.pragmas = pragmas
+        self.row_factory = row_factory
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="sqlite-engine"
+        )
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # Stop event -> queue of every running `batches()` stream
+        self._streams: Dict[threading.Event, "asyncio.Queue[Any]"] = {}
+
+    async def __aenter__(self) -> "ExecutorEngine":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    # -------------------------------
+    # Worker-thread side
+    # -------------------------------
+    def _connection(self) -> sqlite3.Connection:
+        """Return this worker thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only ever used from this thread; check_same_thread is off so
+            # close() can shut it down from the event loop thread.
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            for pragma in self.pragmas:
+                conn.execute(pragma)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _fetchall(self, query: str, params: Sequence[Any], size: int) -> List[Any]:
+        cursor = self._connection().execute(query, params)
+        rows: List[Any] = []
+        try:
+            while True:
+                batch = cursor.fetchmany(size)
+                if not batch:
+                    return rows
+                rows.extend(batch)
+        finally:
+            cursor.close()
+
+    def _execute(self, query: str, params: Sequence[Any]) -> int:
+        conn = self._connection()
+        with conn:
+            return conn.execute(query, params).rowcount
+
+    def _executemany(self, query: str, seq: Sequence[Sequence[Any]]) -> int:
+        conn = self._connection()
+        with conn:
+            return conn.executemany(query, seq).rowcount
+
+    def _stream(
+        self,
+        query: str,
+        params: Sequence[Any],
+        size: int,
+        loop: asyncio.AbstractEventLoop,
+        queue: "asyncio.Queue[Any]",
+        stop: threading.Event,
+    ) -> None:
+        """
+        Push batches into `queue`, blocking while the consumer is behind.
+
+        A blocked put is abandoned once `stop` is set, so a consumer that
+        went away (or `close()`) cannot leave this thread stuck.
+        """
+
+        def put(item: Any) -> bool:
+            if stop.is_set():
+                return False
+            try:
+                future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            except RuntimeError:  # the loop is closed
+                return False
+            while True:
+                try:
+                    future.result(timeout=STOP_POLL)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+                except concurrent.futures.CancelledError:
+                    return False
+
+        try:
+            cursor = self._connection().execute(query, params)
+            try:
+                while not stop.is_set():
+                    batch = cursor.fetchmany(size)
+                    if not batch:
+                        break
+                    if not put(batch):
+                        return
+            finally:
+                cursor.close()
+        except BaseException as e:
+            put(e)
+        else:
+            put(None)
+
+    # -------------------------------
+    # Event-loop side
+    # -------------------------------
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._closed:
+            raise RuntimeError("engine is closed")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def fetchall(
+        self,
+        query: str,
+        params: Sequence[Any] = (),
+        batch_size: Optional[int] = None,
+    ) -> List[Any]:
+        """Run `query` on a worker thread and return every row at once."""
+        return await self._submit(
+            self._fetchall, query, params, batch_size or self.batch_size
+        )
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        """Run one write statement in its own transaction; return rowcount."""
+        return await self._submit(self._execute, query, params)
+
+    async def executemany(self, query: str, seq: Sequence[Sequence[Any]]) -> int:
+        """Run `query` for every parameter set in one transaction."""
+        return await self._submit(self._executemany, query, list(seq))
+
+    async def batches(
+        self,
+        query: str,
+        params: Sequence[Any] = (),
+        batch_size: Optional[int] = None,
+        prefetch: int = DEFAULT_PREFETCH,
+    ) -> AsyncIterator[List[Any]]:
+        """
+        Yield the rows of `query` in `fetchmany` batches.
+
+        The fetch runs on one worker thread (a cursor cannot change threads)
+        and stays at most `prefetch` batches ahead of the consumer. Leaving
+        the loop early stops the fetch and frees the thread.
+
+        Args:
+            query (str): SQL to run.
+            params (Sequence[Any]): Query parameters.
+            batch_size (Optional[int]): Rows per batch; defaults to the engine's.
+            prefetch (int): Batches buffered between the thread and the loop.
+        """
+        if self._closed:
+            raise RuntimeError("engine is closed")
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=max(1, prefetch))
+        stop = threading.Event()
+        with self._lock:
+            self._streams[stop] = queue
+        worker = loop.run_in_executor(
+            self._executor,
+            self._stream,
+            query,
+            params,
+            batch_size or self.batch_size,
+            loop,
+            queue,
+            stop,
+        )
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            with self._lock:
+                self._streams.pop(stop, None)
+            # Unblock a worker waiting on a full queue so it can see `stop`
+            while not worker.done():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.wait([worker], timeout=0.01)
+
+    async def close(self) -> None:
+        """
+        Wait for running work, then close every worker connection.
+
+        Streams still open from `batches()` are stopped first, and their
+        consumers get `RuntimeError` instead of waiting for more batches.
+        """
+        self._closed = True
+        with self._lock:
+            streams = list(self._streams.items())
+        for stop, _ in streams:
+            stop.set()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown, True)
+        for _, queue in streams:
+            # Make room if needed; the consumer gets the error, not a batch
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(RuntimeError("engine is closed"))
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        logger.info(f"Closed {len(conns)} engine connection(s) to {self.db_path}")
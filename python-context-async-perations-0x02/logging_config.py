@@ -0,0 +1,61 @@
+"""
+Lazy logging setup shared by the context manager modules.
+
+Importing a module in this project must not touch the filesystem or install
+handlers. Scripts call `configure()` from their `__main__` block (or a
+service calls it once at startup); library code only uses module loggers.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import List, Optional
+
+LOG_ROOT = "logs"
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+_configured = False
+_lock = threading.Lock()
+
+
+def log_file(name: str) -> str:
+    """
+    Return `logs/<YYYY-MM-DD>/<name>`, creating the dated folder on demand.
+
+    Args:
+        name (str): File name inside today's log folder.
+
+    Returns:
+        str: The log file path.
+    """
+    log_dir = os.path.join(LOG_ROOT, time.strftime("%Y-%m-%d"))
+    os.makedirs(log_dir, exist_ok=True)
+    return os.path.join(log_dir, name)
+
+
+def configure(
+    filename: Optional[str] = None,
+    level: int = logging.INFO,
+    fmt: str = LOG_FORMAT,
+) -> None:
+    """
+    Install console (and optionally file) handlers on the root logger.
+
+    Safe to call more than once; only the first call has an effect.
+
+    Args:
+        filename (Optional[str]): Log file name under today's log folder;
+            None logs to the console only.
+        level (int): Root logger level.
+        fmt (str): Format string for all handlers.
+    """
+    global _configured
+    with _lock:
+        if _configured:
+            return
+        handlers: List[logging.Handler] = [logging.StreamHandler()]
+        if filename:
+            handlers.append(logging.FileHandler(log_file(filename), encoding="utf-8"))
+        logging.basicConfig(level=level, format=fmt, handlers=handlers)
+        _configured = True
@@ -0,0 +1,290 @@
+"""
+Bounded-concurrency scheduler for async query tasks.
+
+`asyncio.gather` starts everything at once. `QueryScheduler` instead keeps a
+priority queue per database and only lets `max_in_flight` tasks run against
+each one; the rest wait their turn (lowest `priority` value first, then
+submission order). Tasks can carry a timeout, a failure can optionally
+cancel every sibling, and each task records how long it waited in the queue
+versus how long it actually ran.
+
+Example:
+    async with QueryScheduler(max_in_flight=2) as scheduler:
+        users = scheduler.submit(async_fetch_users, pool, priority=0)
+        older = scheduler.submit(async_fetch_older_users, pool, priority=1)
+    print(users.result(), scheduler.report())
+"""
+
+from __future__ import annotations
+
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+CANCELLED = "cancelled"
+
+
+class QueryTask:
+    """Handle for one submitted task; await it for the result."""
+
+    def __init__(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        db: str,
+        priority: int,
+        timeout: Optional[float],
+        name: str,
+    ) -> None:
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.db = db
+        self.priority = priority
+        self.timeout = timeout
+        self.name = name
+        self.status = PENDING
+        self.submitted_at = time.perf_counter()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._runner: Optional[asyncio.Task] = None
+
+    def __await__(self):
+        return self.future.__await__()
+
+    def result(self) -> Any:
+        """Return the result (raises if the task failed or is not done)."""
+        return self.future.result()
+
+    @property
+    def wait_seconds(self) -> float:
+        """Time spent queued before starting (so far, if still queued)."""
+        end = self.started_at or self.finished_at or time.perf_counter()
+        return end - self.submitted_at
+
+    @property
+    def run_seconds(self) -> float:
+        """Time spent executing (0 if it never started)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Timing summary for reports."""
+        return {
+            "name": self.name,
+            "db": self.db,
+            "priority": self.priority,
+            "status": self.status,
+            "wait_ms": round(self.wait_seconds * 1000, 3),
+            "run_ms": round(self.run_seconds * 1000, 3),
+        }
+
+
+class QueryScheduler:
+    """
+    Runs submitted coroutine functions with per-database concurrency limits.
+
+    Args:
+        max_in_flight (int): Default limit of running tasks per database.
+        limits (Optional[Dict[str, int]]): Per-database overrides.
+        cancel_on_failure (bool): Cancel every queued and running sibling as
+            soon as one task fails or times out.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 4,
+        limits: Optional[Dict[str, int]] = None,
+        cancel_on_failure: bool = False,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.limits = dict(limits or {})
+        self.cancel_on_failure = cancel_on_failure
+        self.tasks: List[QueryTask] = []
+        self._queues: Dict[str, List[Tuple[int, int, QueryTask]]] = {}
+        self._running: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._cancelling = False
+
+    async def __aenter__(self) -> "QueryScheduler":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is not None:
+            self.cancel_all()
+        await self.wait()
+
+    # ---- submission ---------------------------------------------------
+    def submit(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        db: str = "users.db",
+        priority: int = 0,
+        timeout: Optional[float] = None,
+        name: Optional[str] = None,
+        **kwargs: Any,
+    ) -> QueryTask:
+        """
+        Queue `func(*args, **kwargs)` to run against `db`.
+
+        Args:
+            func (Callable[..., Awaitable[Any]]): Coroutine function to run.
+            db (str): Database the task counts against.
+            priority (int): Lower values run first.
+            timeout (Optional[float]): Seconds the task may run once started.
+            name (Optional[str]): Label for reports; defaults to the function.
+        """
+        task = QueryTask(
+            func, args, kwargs, db, priority, timeout, name or func.__name__
+        )
+        self.tasks.append(task)
+        heapq.heappush(
+            self._queues.setdefault(db, []), (priority, next(self._seq), task)
+        )
+        self._pump(db)
+        return task
+
+    def _pump(self, db: str) -> None:
+        """Start queued tasks for `db` while it has free slots."""
+        if self._cancelling:
+            return
+        queue = self._queues.get(db, [])
+        limit = self.limits.get(db, self.max_in_flight)
+        while queue and self._running.get(db, 0) < limit:
+            _, _, task = heapq.heappop(queue)
+            if task.status != PENDING:
+                continue
+            self._running[db] = self._running.get(db, 0) + 1
+            task.status = RUNNING
+            task.started_at = time.perf_counter()
+            task._runner = asyncio.ensure_future(self._run(task))
+            task._runner.add_done_callback(
+                lambda runner, task=task: self._on_runner_done(task)
+            )
+
+    def _on_runner_done(self, task: QueryTask) -> None:
+        # A runner cancelled before its first step never reaches _run's handlers
+        if task.status == RUNNING:
+            self._finish(task, CANCELLED)
+
+    async def _run(self, task: QueryTask) -> None:
+        try:
+            coro = task.func(*task.args, **task.kwargs)
+            if task.timeout is not None:
+                result = await asyncio.wait_for(coro, task.timeout)
+            else:
+                result = await coro
+        except asyncio.TimeoutError as e:
+            self._finish(task, TIMED_OUT, error=e)
+        except asyncio.CancelledError:
+            self._finish(task, CANCELLED)
+        except Exception as e:
+            self._finish(task, FAILED, error=e)
+        else:
+            self._finish(task, DONE, result=result)
+
+    def _finish(
+        self,
+        task: QueryTask,
+        status: str,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        task.status = status
+        task.finished_at = time.perf_counter()
+        if not task.future.done():
+            if status == DONE:
+                task.future.set_result(result)
+            elif status == CANCELLED:
+                task.future.cancel()
+            else:
+                task.future.set_exception(error)  # type: ignore[arg-type]
+        if task.started_at is not None:
+            self._running[task.db] -= 1
+        if status in (FAILED, TIMED_OUT):
+            logger.error(f"Task {task.name} {status}: {error!r}")
+            if self.cancel_on_failure:
+                self.cancel_all()
+        self._pump(task.db)
+
+    # ---- control ------------------------------------------------------
+    def cancel_all(self) -> None:
+        """Cancel every task that has not finished yet."""
+        # Stop _finish from starting queued siblings while we cancel them
+        self._cancelling = True
+        try:
+            for task in self.tasks:
+                if task.status == PENDING:
+                    self._finish(task, CANCELLED)
+                elif task.status == RUNNING and task._runner is not None:
+                    task._runner.cancel()
+        finally:
+            self._cancelling = False
+
+    async def wait(self) -> None:
+        """Wait until every submitted task has finished, in any state."""
+        while True:
+            pending = [t.future for t in self.tasks if not t.future.done()]
+            if not pending:
+                break
+            await asyncio.wait(pending)
+        # Let cancelled runners unwind before returning
+        await asyncio.gather(
+            *(t._runner for t in self.tasks if t._runner is not None),
+            return_exceptions=True,
+        )
+        # Failures were logged by _finish; mark them observed for asyncio
+        for task in self.tasks:
+            if not task.future.cancelled():
+                task.future.exception()
+
+    async def gather(self, return_exceptions: bool = False) -> List[Any]:
+        """
+        Wait for all tasks and return their results in submission order.
+
+        Without `return_exceptions`, the earliest real failure (an error or a
+        timeout) is raised in preference to the cancellations it caused.
+        """
+        await self.wait()
+        results: List[Any] = []
+        root: Optional[QueryTask] = None
+        for task in self.tasks:
+            if task.future.cancelled():
+                error: BaseException = asyncio.CancelledError(task.name)
+            else:
+                # Retrieving marks the exception as observed for asyncio
+                error = task.future.exception()  # type: ignore[assignment]
+            if error is None:
+                results.append(task.future.result())
+                continue
+            results.append(error)
+            if task.status in (FAILED, TIMED_OUT) and (
+                root is None or (task.finished_at or 0) < (root.finished_at or 0)
+            ):
+                root = task
+        if return_exceptions:
+            return results
+        if root is not None:
+            raise root.future.exception()  # type: ignore[misc]
+        for error in results:
+            if isinstance(error, asyncio.CancelledError):
+                raise error
+        return results
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Per-task status with queue-wait and run time in milliseconds."""
+        return [task.as_dict() for task in self.tasks]
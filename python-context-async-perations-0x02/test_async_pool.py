@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Behavior tests for AsyncSQLitePool.
+
+Covers the FIFO handoff of released connections to waiters and the
+cleanup of a waiter that gives up (times out) before being served.
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from typing import List
+
+from async_pool import AsyncSQLitePool
+
+
+class TestAsyncSQLitePool(unittest.IsolatedAsyncioTestCase):
+    """Checkout order and timeout behavior of a one-connection pool."""
+
+    def setUp(self) -> None:
+        """Create a scratch database directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "pool.db")
+
+    def tearDown(self) -> None:
+        """Remove the scratch database."""
+        self.tmp.cleanup()
+
+    async def test_waiters_served_in_fifo_order(self) -> None:
+        """A released connection goes to the oldest waiter, not a newcomer."""
+        async with AsyncSQLitePool(self.db_path, max_size=1) as pool:
+            held = await pool.acquire()
+            order: List[int] = []
+
+            async def waiter(i: int) -> None:
+                conn = await pool.acquire()
+                order.append(i)
+                self.assertIs(conn, held)
+                pool.release(conn)
+
+            tasks = []
+            for i in range(3):
+                tasks.append(asyncio.create_task(waiter(i)))
+                # Let each waiter queue up before the next one starts
+                await asyncio.sleep(0)
+            self.assertEqual(pool.stats()["waiting"], 3)
+
+            pool.release(held)
+            await asyncio.gather(*tasks)
+            self.assertEqual(order, [0, 1, 2])
+            self.assertEqual(pool.stats()["size"], 1)
+            self.assertEqual(pool.waits, 3)
+
+    async def test_released_connection_skips_idle_when_waiters_queued(self) -> None:
+        """A release with a waiter queued hands off instead of going idle."""
+        async with AsyncSQLitePool(self.db_path, max_size=1) as pool:
+            held = await pool.acquire()
+            pending = asyncio.create_task(pool.acquire())
+            await asyncio.sleep(0)
+            pool.release(held)
+            self.assertIs(await pending, held)
+            self.assertEqual(pool.stats()["idle"], 0)
+            pool.release(held)
+
+    async def test_acquire_timeout_removes_waiter(self) -> None:
+        """A waiter that times out leaves the queue and loses nothing."""
+        async with AsyncSQLitePool(self.db_path, max_size=1) as pool:
+            held = await pool.acquire()
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(pool.acquire(), timeout=0.05)
+            self.assertEqual(pool.stats()["waiting"], 0)
+
+            # The connection is not handed to the abandoned waiter
+            pool.release(held)
+            self.assertEqual(pool.stats()["idle"], 1)
+            async with pool.connection() as conn:
+                self.assertIs(conn, held)
+
+    async def test_close_fails_waiters_and_rejects_acquire(self) -> None:
+        """Closing the pool fails queued waiters and later checkouts."""
+        pool = AsyncSQLitePool(self.db_path, max_size=1)
+        await pool.acquire()
+        pending = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+        await pool.close()
+        with self.assertRaises(RuntimeError):
+            await pending
+        with self.assertRaises(RuntimeError):
+            await pool.acquire()
+
+
+if __name__ == "__main__":
+    unittest.main()
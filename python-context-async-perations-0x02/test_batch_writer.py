@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Behavior tests for BatchWriter.
+
+Covers flushing, closing, per-statement failures and a writer thread
+that dies with statements still queued.
+"""
+
+import importlib.util
+import os
+import sqlite3
+import tempfile
+import unittest
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, List
+from unittest.mock import patch
+
+HERE = Path(__file__).resolve().parent
+
+
+def load_task(filename: str) -> Any:
+    """Import a task module whose file name is not a valid identifier."""
+    name = Path(filename).stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, HERE / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+databaseconnection = load_task("0-databaseconnection.py")
+BatchWriter = databaseconnection.BatchWriter
+
+
+class TestBatchWriter(unittest.TestCase):
+    """Commit, flush, close and failure behavior of BatchWriter."""
+
+    def setUp(self) -> None:
+        """Create a scratch database with an empty `items` table."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "writer.db")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self) -> None:
+        """Remove the scratch database."""
+        self.tmp.cleanup()
+
+    def count(self) -> int:
+        """Return the number of committed rows."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_flush_commits_queued_writes(self) -> None:
+        """After flush every earlier write is committed and resolved."""
+        writer = BatchWriter(self.db_path, max_latency=0.2)
+        try:
+            futures = [
+                writer.write("INSERT INTO items (name) VALUES (?)", (str(i),))
+                for i in range(50)
+            ]
+            writer.flush()
+            self.assertTrue(all(f.done() for f in futures))
+            self.assertEqual([f.result() for f in futures], [1] * 50)
+            self.assertEqual(self.count(), 50)
+            # 200ms of latency lets the whole burst share a transaction
+            self.assertEqual(writer.batches, 1)
+        finally:
+            writer.close()
+
+    def test_max_batch_splits_transactions(self) -> None:
+        """No transaction holds more than max_batch statements."""
+        with BatchWriter(self.db_path, max_batch=10, max_latency=0.2) as writer:
+            writer.writemany(
+                "INSERT INTO items (name) VALUES (?)", [("a",), ("b",)]
+            )
+            for i in range(24):
+                writer.write("INSERT INTO items (name) VALUES (?)", (str(i),))
+            writer.flush()
+            self.assertEqual(writer.statements, 25)
+            self.assertGreaterEqual(writer.batches, 3)
+        self.assertEqual(self.count(), 26)
+
+    def test_close_commits_then_rejects_writes(self) -> None:
+        """Closing commits what is queued; later writes and flushes raise."""
+        writer = BatchWriter(self.db_path, max_latency=0.2)
+        future = writer.write("INSERT INTO items (name) VALUES ('x')")
+        writer.close()
+        self.assertEqual(future.result(timeout=0), 1)
+        self.assertEqual(self.count(), 1)
+        self.assertTrue(writer.closed)
+        with self.assertRaisesRegex(RuntimeError, "writer is closed"):
+            writer.write("INSERT INTO items (name) VALUES ('y')")
+        with self.assertRaisesRegex(RuntimeError, "writer is closed"):
+            writer.flush()
+        # Closing twice is harmless
+        writer.close()
+
+    def test_failing_statement_fails_only_its_future(self) -> None:
+        """A bad statement fails its own future; its batch still commits."""
+        with BatchWriter(self.db_path, max_latency=0.2) as writer:
+            good = writer.write("INSERT INTO items (name) VALUES ('ok')")
+            bad = writer.write("INSERT INTO missing (name) VALUES ('no')")
+            writer.flush()
+        self.assertEqual(good.result(), 1)
+        with self.assertRaises(sqlite3.OperationalError):
+            bad.result()
+        self.assertEqual(self.count(), 1)
+
+    def test_writer_thread_failure_fails_pending_futures(self) -> None:
+        """If the writer thread dies, every queued future gets the error."""
+        error = RuntimeError("disk gone")
+        with patch.object(BatchWriter, "_commit", side_effect=error):
+            writer = BatchWriter(self.db_path, max_latency=0.2)
+            futures: List["Future[int]"] = [
+                writer.write("INSERT INTO items (name) VALUES (?)", (str(i),))
+                for i in range(5)
+            ]
+            for future in futures:
+                self.assertIs(future.exception(timeout=5), error)
+            writer._thread.join(timeout=5)
+
+        self.assertTrue(writer.closed)
+        with self.assertRaisesRegex(RuntimeError, "writer is closed") as ctx:
+            writer.write("INSERT INTO items (name) VALUES ('late')")
+        self.assertIs(ctx.exception.__cause__, error)
+        self.assertEqual(self.count(), 0)
+
+    def test_get_writer_replaces_closed_writer(self) -> None:
+        """get_writer shares one writer and starts a new one once closed."""
+        first = databaseconnection.get_writer(self.db_path)
+        self.assertIs(databaseconnection.get_writer(self.db_path), first)
+        first.close()
+        second = databaseconnection.get_writer(self.db_path)
+        try:
+            self.assertIsNot(second, first)
+            self.assertFalse(second.closed)
+        finally:
+            second.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Behavior tests for QueryScheduler.
+
+Covers which error `gather` raises when one failure cancels its siblings,
+and what `cancel_all` does to queued and running tasks.
+"""
+
+import asyncio
+import unittest
+
+from query_scheduler import CANCELLED, DONE, FAILED, PENDING, QueryScheduler
+
+
+async def sleep_then(seconds: float, value: int = 0) -> int:
+    """Sleep, then return `value`."""
+    await asyncio.sleep(seconds)
+    return value
+
+
+async def fail_after(seconds: float) -> None:
+    """Sleep, then raise ValueError."""
+    await asyncio.sleep(seconds)
+    raise ValueError("boom")
+
+
+class TestQuerySchedulerGather(unittest.IsolatedAsyncioTestCase):
+    """Result and error propagation through QueryScheduler.gather."""
+
+    async def test_results_in_submission_order(self) -> None:
+        """Results come back in submission order, not completion order."""
+        scheduler = QueryScheduler(max_in_flight=2)
+        scheduler.submit(sleep_then, 0.03, 1)
+        scheduler.submit(sleep_then, 0.0, 2)
+        scheduler.submit(sleep_then, 0.01, 3)
+        self.assertEqual(await scheduler.gather(), [1, 2, 3])
+
+    async def test_root_failure_raised_over_cancellations(self) -> None:
+        """The failure that cancelled its siblings is what gather raises."""
+        scheduler = QueryScheduler(max_in_flight=1, cancel_on_failure=True)
+        slow = scheduler.submit(sleep_then, 10.0, name="slow")
+        failing = scheduler.submit(fail_after, 0.0, db="other.db", name="fail")
+        queued = scheduler.submit(sleep_then, 0.0, name="queued")
+
+        with self.assertRaisesRegex(ValueError, "boom"):
+            await scheduler.gather()
+        self.assertEqual(failing.status, FAILED)
+        self.assertEqual(slow.status, CANCELLED)
+        self.assertEqual(queued.status, CANCELLED)
+        # The queued task was cancelled before it ever started
+        self.assertEqual(queued.run_seconds, 0.0)
+
+    async def test_earliest_failure_wins(self) -> None:
+        """With several failures, the first to finish is the one raised."""
+        scheduler = QueryScheduler(max_in_flight=2)
+
+        async def fail_with(seconds: float, message: str) -> None:
+            await asyncio.sleep(seconds)
+            raise ValueError(message)
+
+        scheduler.submit(fail_with, 0.03, "late")
+        scheduler.submit(fail_with, 0.0, "early")
+        with self.assertRaisesRegex(ValueError, "early"):
+            await scheduler.gather()
+
+    async def test_return_exceptions(self) -> None:
+        """With return_exceptions the errors are returned in place."""
+        scheduler = QueryScheduler(max_in_flight=2)
+        scheduler.submit(sleep_then, 0.0, 1)
+        scheduler.submit(fail_after, 0.0)
+        ok, error = await scheduler.gather(return_exceptions=True)
+        self.assertEqual(ok, 1)
+        self.assertIsInstance(error, ValueError)
+
+    async def test_timeout_is_a_root_failure(self) -> None:
+        """A task that exceeds its timeout fails gather with TimeoutError."""
+        scheduler = QueryScheduler(cancel_on_failure=True)
+        scheduler.submit(sleep_then, 10.0, timeout=0.01)
+        with self.assertRaises(asyncio.TimeoutError):
+            await scheduler.gather()
+
+
+class TestQuerySchedulerCancelAll(unittest.IsolatedAsyncioTestCase):
+    """Effect of cancel_all on queued, running and finished tasks."""
+
+    async def test_cancel_all(self) -> None:
+        """Running and queued tasks are cancelled; finished ones keep results."""
+        scheduler = QueryScheduler(max_in_flight=1)
+        done = scheduler.submit(sleep_then, 0.0, 7, db="fast.db")
+        running = scheduler.submit(sleep_then, 10.0)
+        queued = scheduler.submit(sleep_then, 0.0)
+        await done
+        self.assertEqual(queued.status, PENDING)
+
+        scheduler.cancel_all()
+        with self.assertRaises(asyncio.CancelledError):
+            await scheduler.gather()
+
+        self.assertEqual(done.status, DONE)
+        self.assertEqual(done.result(), 7)
+        self.assertEqual(running.status, CANCELLED)
+        self.assertEqual(queued.status, CANCELLED)
+        self.assertTrue(queued.future.cancelled())
+        # Nothing is left counted against the database
+        self.assertEqual(scheduler._running["users.db"], 0)
+
+    async def test_exception_in_block_cancels_tasks(self) -> None:
+        """Leaving the async with block on an error cancels what is left."""
+        with self.assertRaises(KeyError):
+            async with QueryScheduler() as scheduler:
+                task = scheduler.submit(sleep_then, 10.0)
+                await asyncio.sleep(0)
+                raise KeyError("stop")
+        self.assertEqual(task.status, CANCELLED)
+
+
+if __name__ == "__main__":
+    unittest.main()
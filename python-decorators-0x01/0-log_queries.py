@@ -1,58 +1,208 @@
+"""
+Task 0: Logging Database Queries
+
+Defines `log_queries`, a decorator that records every decorated query as a
+structured JSON line (fingerprint, latency, rows) through a QueueHandler and
+a background QueueListener, with sampling and a slow-query threshold.
+Every call, sampled or not, also feeds the latency histograms in
+`query_metrics.registry`.
+"""
+
+import json
+import time
+import queue
+import random
+import atexit
 import sqlite3
 import functools
+import inspect
 import logging
-from pathlib import Path
-from datetime import datetime
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Optional
+
+from db_decorators import DEFAULT_CHUNK_SIZE, stream_query
+from db_decorators.streaming import RowFactory
+from logging_config import log_file
+from query_metrics import fingerprint, registry
+
+if TYPE_CHECKING:
+    from logging.handlers import QueueListener
+
+logger = logging.getLogger(__name__)
 
 # -------------------------------
-# Configure logger
+# Non-blocking structured logging
 # -------------------------------
 
-# Create logs directory if it doesn't exist
-# Create a date-stamped folder name
-today_str = datetime.now().strftime("%Y-%m-%d")
-LOG_DIR = Path("logs") / today_str
-LOG_DIR.mkdir(exist_ok=True)
+# Fraction of successful queries that are logged; slow queries and errors
+# are always logged regardless of sampling.
+SAMPLE_RATE = 1.0
+SLOW_QUERY_MS = 100.0
 
-LOG_FILE = LOG_DIR / "query.log"
 
-# Configure root logger
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler(),  # logs to console
-    ],
-)
+class JsonFormatter(logging.Formatter):
+    """Render a record and its structured `fields` as one JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional["QueueListener"] = None
+_listener_lock = threading.Lock()
+
+
+def _start_listener() -> None:
+    """
+    Start the background writer on first use and stop it at exit.
+
+    Nothing is created at import time: the log folder, file handle and
+    writer thread only appear once the first record is emitted.
+    """
+    # logging.handlers pulls in socket; only pay for it once logging starts
+    from logging.handlers import QueueHandler, QueueListener
+
+    class PassThroughQueueHandler(QueueHandler):
+        """QueueHandler that skips formatting in the caller's thread."""
+
+        def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+            return record
+
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        formatter = JsonFormatter()
+        handlers: List[logging.Handler] = [
+            logging.FileHandler(log_file("query.log"), encoding="utf-8"),
+            logging.StreamHandler(),  # logs to console
+        ]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        _listener = QueueListener(_log_queue, *handlers)
+        _listener.start()
+        atexit.register(_listener.stop)
+        logger.addHandler(PassThroughQueueHandler(_log_queue))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
 
-logger = logging.getLogger(__name__)
 
 # -------------------------------
 # Decorator definition
 # -------------------------------
 
 
-def log_queries(func):
-    """Decorator to log SQL queries using Python's logging system."""
+def _emit(
+    query: Any,
+    started_ns: int,
+    result: Any,
+    sample_rate: float,
+    slow_ms: float,
+) -> None:
+    """Record latency metrics and log a structured record if slow or sampled."""
+    duration_ms = (time.perf_counter_ns() - started_ns) / 1e6
+    # The first positional argument is not always the SQL (e.g. a connection)
+    sql = query if isinstance(query, str) and query else None
+    if sql:
+        registry.record(sql, duration_ms / 1000)
+    slow = duration_ms >= slow_ms
+    if not slow and (sample_rate <= 0 or random.random() >= sample_rate):
+        return
+    if _listener is None:
+        _start_listener()
+    try:
+        rows = len(result)
+    except TypeError:
+        rows = None
+    fields = {
+        "fingerprint": fingerprint(sql) if sql else None,
+        "duration_ms": round(duration_ms, 3),
+        "rows": rows,
+    }
+    if slow:
+        logger.warning("slow_query", extra={"fields": fields})
+    else:
+        logger.info("query", extra={"fields": fields})
+
 
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        query = kwargs.get("query") or (args[0] if args else None)
-        if query:
-            logger.info(f"Executing SQL Query: {query}")
-        else:
-            logger.warning("No SQL query provided to function.")
+def _emit_error(query: Any, started_ns: int, exc: Exception) -> None:
+    """Log a failed query; errors are never sampled out."""
+    duration_ms = (time.perf_counter_ns() - started_ns) / 1e6
+    sql = query if isinstance(query, str) and query else None
+    if sql:
+        registry.record(sql, duration_ms / 1000, error=True)
+    if _listener is None:
+        _start_listener()
+    fields = {
+        "fingerprint": fingerprint(sql) if sql else None,
+        "duration_ms": round(duration_ms, 3),
+        "error": f"{type(exc).__name__}: {exc}",
+    }
+    logger.error("query_error", exc_info=exc, extra={"fields": fields})
 
-        try:
-            result = func(*args, **kwargs)
-            logger.info("Query executed successfully.")
+
+def log_queries(
+    func: Optional[Callable[..., Any]] = None,
+    *,
+    sample_rate: float = SAMPLE_RATE,
+    slow_ms: float = SLOW_QUERY_MS,
+):
+    """Decorator to log SQL queries as structured, non-blocking records.
+
+    Each record carries the query fingerprint, latency and row count. Records
+    are handed to a background writer thread, so the caller only pays for
+    timing and an enqueue. Works for both regular and coroutine functions and
+    can be used bare (`@log_queries`) or configured
+    (`@log_queries(sample_rate=0.01, slow_ms=50)`).
+
+    Args:
+        func (Optional[Callable[..., Any]]): The function when used bare.
+        sample_rate (float): Fraction of normal queries to log.
+        slow_ms (float): Queries at least this slow are always logged.
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                query = kwargs.get("query") or (args[0] if args else None)
+                started = time.perf_counter_ns()
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    _emit_error(query, started, e)
+                    raise
+                _emit(query, started, result, sample_rate, slow_ms)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            query = kwargs.get("query") or (args[0] if args else None)
+            started = time.perf_counter_ns()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                _emit_error(query, started, e)
+                raise
+            _emit(query, started, result, sample_rate, slow_ms)
             return result
-        except Exception as e:
-            logger.exception(f"Error executing SQL query: {e}")
-            raise
 
-    return wrapper
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
 
 
 # -------------------------------
@@ -71,15 +221,44 @@ def fetch_all_users(query):
     return results
 
 
+def iter_all_users(
+    query: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    row_factory: RowFactory = None,
+) -> Iterator[Any]:
+    """
+    Stream users in `fetchmany` chunks instead of materializing them all.
+
+    The pooled connection is held only while the generator is being
+    consumed; `row_factory="slots"` or `"namedtuple"` yields records.
+    """
+    return stream_query(query, chunk_size=chunk_size, row_factory=row_factory)
+
+
+@log_queries
+async def async_fetch_all_users(query):
+    """Fetch all users from the users.db table using aiosqlite."""
+    import aiosqlite
+
+    async with aiosqlite.connect("users.db") as conn:
+        async with conn.execute(query) as cursor:
+            return await cursor.fetchall()
+
+
 # -------------------------------
 # Usage
 # -------------------------------
 if __name__ == "__main__":
+    import asyncio
+
     users = fetch_all_users(query="SELECT * FROM users")
     print(users)
+    print(asyncio.run(async_fetch_all_users(query="SELECT * FROM users")))
+    for user in iter_all_users("SELECT * FROM users", row_factory="slots"):
+        print(user)
+    print(registry.report())
 
 
 # Output
-# 2025-11-08 22:05:28,006 | INFO | Executing SQL Query: SELECT * FROM users
-# 2025-11-08 22:05:28,012 | INFO | Query executed successfully.
+# {"ts": "2025-11-08 22:05:28,012", "level": "INFO", "event": "query", "fingerprint": "SELECT * FROM users", "duration_ms": 0.412, "rows": 3}
 # [(1, 'Alice Johnson', 'alice@example.com', '2025-11-08 18:59:14'), (2, 'Bob Smith', 'bob@example.com', '2025-11-08 18:59:14'), (3, 'Charlie Lee', 'charlie@example.com', '2025-11-08 18:59:14')]
@@ -4,70 +4,34 @@ Task 1: Handle Database Connections with a Decorator
 This module defines a decorator `with_db_connection` that automatically
 handles opening and closing SQLite database connections for functions
 that perform database operations.
+
+Coroutine functions are detected and receive an `aiosqlite` connection
+instead, so async callers never block the event loop.
+
+The implementation lives in the shared `db_decorators` package (pooled
+connections plus one instrumentation hook) and is re-exported here.
+`route_query` is the read/write-splitting variant: SELECTs run on a pool
+of read-only connections, everything else on a single writer.
 """
 
+from __future__ import annotations
+
 import sqlite3
-import functools
 import logging
-from typing import Any, Callable, TypeVar, Optional
+from typing import TYPE_CHECKING, Optional
 
-from pathlib import Path
-from datetime import datetime
-
-# -------------------------------
-# Configure logger
-# -------------------------------
-
-# Create logs directory if it doesn't exist
-# Create a date-stamped folder name
-today_str = datetime.now().strftime("%Y-%m-%d")
-LOG_DIR = Path("logs") / today_str
-LOG_DIR.mkdir(exist_ok=True)
-
-LOG_FILE = LOG_DIR / "db_connection.log"
-
-# Configure logging for visibility
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-    ],
+from db_decorators import (
+    logging_hook,
+    route_query,
+    set_instrumentation,
+    with_db_connection,
 )
+from logging_config import configure
 
-# Name logger
-logger = logging.getLogger(__name__)
-
-# Type hint for decorator
-F = TypeVar("F", bound=Callable[..., Any])
-
-
-def with_db_connection(func: F) -> F:
-    """
-    Decorator to automatically open and close a database connection.
+if TYPE_CHECKING:
+    import aiosqlite
 
-    The wrapped function must accept `conn` as its first argument.
-    """
-
-    # preserves the func runtime metadata (name, docstring, annotations)
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = None
-        try:
-            conn = sqlite3.connect("users.db")
-            logging.info("Opened database connection to 'users.db'")
-            result = func(conn, *args, **kwargs)
-            return result
-        except sqlite3.Error as e:
-            logging.error(f"Database error: {e}")
-            raise
-        finally:
-            if conn:
-                conn.close()
-                logging.info("Closed database connection to 'users.db'")
-
-    return wrapper  # type: ignore (needed because wrapper isn't strictly F)
+logger = logging.getLogger(__name__)
 
 
 @with_db_connection
@@ -80,9 +44,35 @@ def get_user_by_id(conn: Optional[sqlite3.Connection] = None, user_id: int = 0):
         return cursor.fetchone()
 
 
+@with_db_connection
+async def async_get_user_by_id(
+    conn: Optional[aiosqlite.Connection] = None, user_id: int = 0
+):
+    """Fetch a user by ID without blocking the event loop."""
+
+    if conn:
+        async with conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)) as cur:
+            return await cur.fetchone()
+
+
+@route_query
+def run_query(conn: sqlite3.Connection, query: str, params: tuple = ()):
+    """Run `query` on a reader or the writer, depending on what it does."""
+    rows = conn.execute(query, params).fetchall()
+    if conn.in_transaction:
+        conn.commit()
+    return rows
+
+
 # -------------------------------
 # Usage
 # -------------------------------
 if __name__ == "__main__":
+    import asyncio
+
+    configure("db_connection.log")
+    set_instrumentation(logging_hook)
     user = get_user_by_id(user_id=1)
     print(user)
+    print(asyncio.run(async_get_user_by_id(user_id=1)))
+    print(run_query("SELECT COUNT(*) FROM users"))
@@ -5,38 +5,40 @@ Task 2: Transaction Management Decorator
 This module implements a `transactional` decorator that ensures
 database operations are executed within a transaction context.
 If an exception occurs, the transaction is rolled back; otherwise, it is committed.
+
+Both decorators also accept coroutine functions, in which case the connection
+is an `aiosqlite.Connection` and commit/rollback are awaited.
+
+Nested `transactional` calls on the same connection use savepoints, and
+`group_commit` lets many small logical transactions share a single commit.
 """
 
+from __future__ import annotations
+
 import sqlite3
 import functools
+import inspect
+import itertools
 import logging
-from typing import Any, Callable, TypeVar, Optional
-from pathlib import Path
-from datetime import datetime
-
-# -------------------------------
-# Configure logger
-# -------------------------------
-
-# Create logs directory if it doesn't exist
-# Create a date-stamped folder name
-today_str = datetime.now().strftime("%Y-%m-%d")
-LOG_DIR = Path("logs") / today_str
-LOG_DIR.mkdir(exist_ok=True)
-
-LOG_FILE = LOG_DIR / "transactions.log"
-
-# Configure logging for visibility
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-    ],
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
 )
 
-# Name logger
+from db_decorators import logging_hook, set_instrumentation, with_db_connection
+from logging_config import configure
+
+if TYPE_CHECKING:
+    import aiosqlite
+
 logger = logging.getLogger(__name__)
 
 # Type hint for decorator
@@ -44,57 +46,151 @@ F = TypeVar("F", bound=Callable[..., Any])
 
 
 # ----------------------------------
-# Decorator: with_db_connection
+# Decorator: transactional
 # ----------------------------------
-def with_db_connection(func: F) -> F:
+BEGIN_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+# Savepoint names only need to be unique among the open nesting levels
+_savepoint_ids = itertools.count(1)
+
+
+def _begin_sql(mode: str) -> str:
+    """Validate a BEGIN mode and return the statement that opens it."""
+    mode = mode.upper()
+    if mode not in BEGIN_MODES:
+        raise ValueError(f"mode must be one of {BEGIN_MODES}, got {mode!r}")
+    return f"BEGIN {mode}"
+
+
+def transactional(func: Optional[F] = None, *, mode: str = "DEFERRED"):
     """
-    Decorator to automatically open and close a database connection.
+    Decorator to manage transactions.
+    Commits if successful, rolls back on error.
+
+    If the connection is already inside a transaction (an outer
+    `transactional` call or a `group_commit` block), the function runs in a
+    SAVEPOINT instead: success RELEASEs it and failure rolls back to it, so
+    only the outermost level commits and atomicity is preserved.
 
-    The wrapped function must accept `conn` as its first argument.
+    Args:
+        func (Optional[F]): The function when used bare (`@transactional`).
+        mode (str): DEFERRED, IMMEDIATE or EXCLUSIVE. IMMEDIATE takes the
+            write lock up front, avoiding deadlocks when two readers both try
+            to upgrade to writers.
     """
+    begin = _begin_sql(mode)
+
+    def decorator(func: F) -> F:
+        name = func.__name__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(conn: aiosqlite.Connection, *args, **kwargs):
+                if conn.in_transaction:
+                    savepoint = f"sp_{next(_savepoint_ids)}"
+                    await conn.execute(f"SAVEPOINT {savepoint}")
+                    try:
+                        result = await func(conn, *args, **kwargs)
+                    except Exception as e:
+                        await conn.execute(f"ROLLBACK TO {savepoint}")
+                        await conn.execute(f"RELEASE {savepoint}")
+                        logger.error(f"Savepoint rolled back for {name} due to: {e}")
+                        raise
+                    await conn.execute(f"RELEASE {savepoint}")
+                    return result
+
+                try:
+                    logger.info(f"Starting transaction for {name}")
+                    await conn.execute(begin)
+                    result = await func(conn, *args, **kwargs)
+                    await conn.commit()
+                    logger.info(f"Transaction committed for {name}")
+                    return result
+                except Exception as e:
+                    await conn.rollback()
+                    logger.error(f"Transaction rolled back for {name} due to: {e}")
+                    raise
+
+            return async_wrapper  # type: ignore
+
+        @functools.wraps(func)
+        def wrapper(conn: sqlite3.Connection, *args, **kwargs):
+            if conn.in_transaction:
+                savepoint = f"sp_{next(_savepoint_ids)}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+                try:
+                    result = func(conn, *args, **kwargs)
+                except Exception as e:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                    logger.error(f"Savepoint rolled back for {name} due to: {e}")
+                    raise
+                conn.execute(f"RELEASE {savepoint}")
+                return result
+
+            try:
+                logger.info(f"Starting transaction for {name}")
+                conn.execute(begin)
+                result = func(conn, *args, **kwargs)
+                conn.commit()
+                logger.info(f"Transaction committed for {name}")
+                return result
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Transaction rolled back for {name} due to: {e}")
+                raise
 
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = None
-        try:
-            conn = sqlite3.connect("users.db")
-            logging.info("Opened database connection to 'users.db'")
-            result = func(conn, *args, **kwargs)
-            return result
-        except sqlite3.Error as e:
-            logging.error(f"Database error: {e}")
-            raise
-        finally:
-            if conn:
-                conn.close()
-                logging.info("Closed database connection to 'users.db'")
-
-    return wrapper  # type: ignore
+        return wrapper  # type: ignore
+
+    if func is not None:
+        return decorator(func)
+    return decorator
 
 
 # ----------------------------------
-# Decorator: transactional
+# Group commit
 # ----------------------------------
-def transactional(func: F) -> F:
+@contextmanager
+def group_commit(
+    conn: sqlite3.Connection, mode: str = "IMMEDIATE"
+) -> Iterator[sqlite3.Connection]:
     """
-    Decorator to manage transactions.
-    Commits if successful, rolls back on error.
+    Run many small `transactional` calls under one COMMIT (and one fsync).
+
+    Each call inside the block becomes a savepoint, so a failing unit only
+    undoes its own work while the rest of the group still commits together.
+
+    Example:
+        with group_commit(conn):
+            for user_id, email in updates:
+                update_email(conn, user_id, email)
     """
+    conn.execute(_begin_sql(mode))
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        logger.error("Group commit rolled back")
+        raise
+    conn.commit()
+    logger.info("Group commit completed")
 
-    @functools.wraps(func)
-    def wrapper(conn: sqlite3.Connection, *args, **kwargs):
-        try:
-            logging.info(f"Starting transaction for {func.__name__}")
-            result = func(conn, *args, **kwargs)
-            conn.commit()
-            logging.info(f"Transaction committed for {func.__name__}")
-            return result
-        except Exception as e:
-            conn.rollback()
-            logging.error(f"Transaction rolled back for {func.__name__} due to: {e}")
-            raise
 
-    return wrapper  # type: ignore
+@asynccontextmanager
+async def async_group_commit(
+    conn: aiosqlite.Connection, mode: str = "IMMEDIATE"
+) -> AsyncIterator[aiosqlite.Connection]:
+    """Async counterpart of `group_commit` for aiosqlite connections."""
+    await conn.execute(_begin_sql(mode))
+    try:
+        yield conn
+    except BaseException:
+        await conn.rollback()
+        logger.error("Group commit rolled back")
+        raise
+    await conn.commit()
+    logger.info("Group commit completed")
 
 
 # ----------------------------------
@@ -109,17 +205,60 @@ def update_user_email(
     if conn:
         cursor = conn.cursor()
         cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
-        logging.info(f"User {user_id} email updated to {new_email}")
+        logger.info(f"User {user_id} email updated to {new_email}")
+
+
+@with_db_connection
+@transactional
+async def async_update_user_email(
+    conn: Optional[aiosqlite.Connection] = None, user_id: int = 0, new_email: str = ""
+):
+    """Update a user's email address without blocking the event loop."""
+    if conn:
+        await conn.execute(
+            "UPDATE users SET email = ? WHERE id = ?", (new_email, user_id)
+        )
+        logger.info(f"User {user_id} email updated to {new_email}")
+
+
+@transactional
+def set_user_email(conn: sqlite3.Connection, user_id: int, new_email: str):
+    """Update one email; nests as a savepoint inside an outer transaction."""
+    conn.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+
+@with_db_connection
+def bulk_update_emails(
+    conn: Optional[sqlite3.Connection] = None, updates: Sequence[Tuple[int, str]] = ()
+):
+    """Apply many small email updates with a single commit."""
+    if conn:
+        with group_commit(conn):
+            for user_id, new_email in updates:
+                set_user_email(conn, user_id, new_email)
 
 
 if __name__ == "__main__":
+    import asyncio
+
+    configure("transactions.log")
+    set_instrumentation(logging_hook)
     update_user_email(user_id=1, new_email="Crawford_Cartwright@hotmail.com")
+    bulk_update_emails(updates=[(2, "bob@example.com"), (3, "charlie@example.com")])
+    asyncio.run(
+        async_update_user_email(user_id=1, new_email="Crawford_Cartwright@hotmail.com")
+    )
     print("Email update completed successfully.")
 
 # Output
-# 2025-11-09 00:43:58,764 [INFO] Opened database connection to 'users.db'
 # 2025-11-09 00:43:58,766 [INFO] Starting transaction for update_user_email
-# 2025-11-09 00:43:58,778 [INFO] User 1 email updated to Crawford_Cartwright@hotmail.com
-# 2025-11-09 00:43:58,788 [INFO] Transaction committed for update_user_email
-# 2025-11-09 00:43:58,789 [INFO] Closed database connection to 'users.db'
+# 2025-11-09 00:43:58,766 [INFO] User 1 email updated to Crawford_Cartwright@hotmail.com
+# 2025-11-09 00:43:58,767 [INFO] Transaction committed for update_user_email
+# 2025-11-09 00:43:58,767 [INFO] update_user_email used 'users.db' for 2.116 ms
+# 2025-11-09 00:43:58,767 [INFO] Group commit completed
+# 2025-11-09 00:43:58,767 [INFO] bulk_update_emails used 'users.db' for 0.167 ms
+# 2025-11-09 00:43:58,776 [INFO] Starting transaction for async_update_user_email
+# 2025-11-09 00:43:58,776 [INFO] User 1 email updated to Crawford_Cartwright@hotmail.com
+# 2025-11-09 00:43:58,777 [INFO] Transaction committed for async_update_user_email
+# 2025-11-09 00:43:58,777 [INFO] async_update_user_email used 'users.db' for 9.610 ms
 # Email update completed successfully.
@@ -5,39 +5,45 @@ Task 3: Retry Database Queries Decorator
 Implements a retry_on_failure(retries=3, delay=2) decorator that automatically
 retries database operations on transient errors. Integrated with the
 @with_db_connection decorator for seamless connection handling.
+
+Retries use exponential backoff with full jitter, an optional deadline and a
+process-wide retry budget. Only lock/busy errors are retried by default, and
+retry counts and wait time are exported through `retry_metrics.snapshot()`.
+Coroutine functions are supported and back off with `asyncio.sleep`.
+
+Wrap the retrying function in `circuit_breaker()` (outermost) so
+that during an outage callers fail fast instead of sleeping through every
+attempt.
 """
 
+from __future__ import annotations
+
 import time
+import random
 import sqlite3
 import functools
+import inspect
 import logging
-from typing import Any, Callable, TypeVar, Optional
-from pathlib import Path
-from datetime import datetime
-
-# -------------------------------
-# Configure logger
-# -------------------------------
-
-# Create logs directory if it doesn't exist
-# Create a date-stamped folder name
-today_str = datetime.now().strftime("%Y-%m-%d")
-LOG_DIR = Path("logs") / today_str
-LOG_DIR.mkdir(exist_ok=True)
-
-LOG_FILE = LOG_DIR / "retry_queries.log"
-
-# Configure logging for visibility
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-    ],
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, TypeVar, Optional
+
+from db_decorators import (
+    DEFAULT_CHUNK_SIZE,
+    DeadlineExceeded,
+    circuit_breaker,
+    get_breaker,
+    logging_hook,
+    remaining,
+    set_instrumentation,
+    stream_query,
+    with_db_connection,
 )
+from logging_config import configure
+
+if TYPE_CHECKING:
+    import aiosqlite
+    from db_decorators.streaming import RowFactory
 
-# Name logger
 logger = logging.getLogger(__name__)
 
 # Type hint for decorator
@@ -45,65 +51,224 @@ F = TypeVar("F", bound=Callable[..., Any])
 
 
 # ------------------------------
-# Decorator: with_db_connection
+# Retry policy helpers
 # ------------------------------
-def with_db_connection(func: F) -> F:
+# SQLite reports lock contention through these message fragments; every
+# other DatabaseError (schema errors, corruption, bad SQL) is permanent.
+TRANSIENT_MESSAGES = (
+    "database is locked",
+    "database is busy",
+    "database table is locked",
+)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    Classify an exception as transient (worth retrying) or permanent.
+
+    Args:
+        exc (BaseException): The exception raised by the wrapped call.
+
+    Returns:
+        bool: True only for lock/busy style operational errors.
+    """
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    if isinstance(exc, DeadlineExceeded):
+        return False
+    message = str(exc).lower()
+    return any(fragment in message for fragment in TRANSIENT_MESSAGES)
+
+
+class RetryBudget:
+    """
+    Process-wide token bucket that caps how many retries may be issued.
+
+    Every retry spends one token; tokens refill at `refill_rate` per second
+    up to `capacity`. When the bucket is empty callers fail fast instead of
+    piling more load onto a database that is already contended.
     """
-    Decorator to automatically open and close a SQLite database connection.
 
-    The wrapped function must accept `conn` as its first parameter.
+    def __init__(self, capacity: float = 100.0, refill_rate: float = 10.0) -> None:
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Spend one retry token, returning False if the budget is exhausted."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class RetryMetrics:
+    """Thread-safe counters describing retry behaviour across the process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero every counter."""
+        with self._lock:
+            self.calls = 0
+            self.retries = 0
+            self.give_ups = 0
+            self.budget_exhausted = 0
+            self.permanent_errors = 0
+            self.wait_seconds = 0.0
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        """Increment the counter `name` by `amount`."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return a point-in-time copy of all counters."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "give_ups": self.give_ups,
+                "budget_exhausted": self.budget_exhausted,
+                "permanent_errors": self.permanent_errors,
+                "wait_seconds": self.wait_seconds,
+            }
+
+
+# Shared by every decorated function unless a caller supplies its own
+retry_budget = RetryBudget()
+retry_metrics = RetryMetrics()
+
+
+def backoff_delay(attempt: int, base: float, max_delay: float) -> float:
     """
+    Exponential backoff with full jitter.
 
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = None
-        try:
-            conn = sqlite3.connect("users.db")
-            logging.info("Opened database connection to 'users.db'")
-            result = func(conn, *args, **kwargs)
-            return result
-        except sqlite3.Error as e:
-            logging.error(f"Database error: {e}")
-            raise
-        finally:
-            if conn:
-                conn.close()
-                logging.info("Closed database connection to 'users.db'")
-
-    return wrapper  # type: ignore
+    Args:
+        attempt (int): 1-based number of the attempt that just failed.
+        base (float): Delay ceiling for the first retry, in seconds.
+        max_delay (float): Upper bound for any single sleep, in seconds.
+
+    Returns:
+        float: Seconds to sleep, uniformly drawn from [0, capped ceiling].
+    """
+    ceiling = min(max_delay, base * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
 
 
 # ------------------------------
 # Decorator: retry_on_failure
 # ------------------------------
-def retry_on_failure(retries: int = 3, delay: int = 2) -> Callable[[F], F]:
+def retry_on_failure(
+    retries: int = 3,
+    delay: float = 2,
+    *,
+    max_delay: float = 30.0,
+    deadline: Optional[float] = None,
+    classifier: Callable[[BaseException], bool] = is_transient_error,
+    budget: Optional[RetryBudget] = retry_budget,
+    metrics: RetryMetrics = retry_metrics,
+) -> Callable[[F], F]:
     """
     Decorator to retry a function call if it raises a transient exception.
 
+    Sleeps follow exponential backoff with full jitter so contending callers
+    spread out instead of waking in lockstep.
+
     Args:
-        retries (int): Number of times to retry the operation.
-        delay (int): Delay in seconds between retries.
+        retries (int): Maximum number of attempts.
+        delay (float): Base delay in seconds; doubles on every attempt.
+        max_delay (float): Cap for a single backoff sleep in seconds.
+        deadline (Optional[float]): Total seconds allowed across all attempts.
+            A tighter `db_decorators.deadline(...)` around the call also
+            applies.
+        classifier (Callable[[BaseException], bool]): Returns True for errors
+            worth retrying. Defaults to lock/busy errors only.
+        budget (Optional[RetryBudget]): Token bucket shared by callers; None
+            disables budgeting.
+        metrics (RetryMetrics): Counters updated with retries and wait time.
     """
 
+    def next_wait(
+        e: Exception, attempt: int, started: float, name: str
+    ) -> Optional[float]:
+        """Return seconds to back off before the next attempt, or None to give up."""
+        if not classifier(e):
+            metrics.incr("permanent_errors")
+            logger.error(f"Permanent error in {name}: {e}")
+            return None
+        logger.warning(f"Transient error on attempt {attempt} for {name}: {e}")
+        if attempt == retries:
+            metrics.incr("give_ups")
+            logger.error(f"Operation failed after {retries} retries: {name}")
+            return None
+
+        wait = backoff_delay(attempt, delay, max_delay)
+        if deadline is not None:
+            left = deadline - (time.monotonic() - started)
+            if left <= wait:
+                metrics.incr("give_ups")
+                logger.error(f"Deadline of {deadline}s exhausted for {name}")
+                return None
+        # The caller's `deadline(...)` context caps retries the same way
+        left = remaining()
+        if left is not None and left <= wait:
+            metrics.incr("give_ups")
+            logger.error(f"Request deadline leaves {left:.3f}s; not retrying {name}")
+            return None
+        if budget is not None and not budget.try_acquire():
+            metrics.incr("budget_exhausted")
+            logger.error(f"Retry budget exhausted for {name}")
+            return None
+
+        metrics.incr("retries")
+        metrics.incr("wait_seconds", wait)
+        logger.info(f"Retrying in {wait:.3f} seconds...")
+        return wait
+
     def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                import asyncio
+
+                metrics.incr("calls")
+                started = time.monotonic()
+                for attempt in range(1, retries + 1):
+                    try:
+                        logger.info(f"Attempt {attempt}/{retries} for {func.__name__}")
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        wait = next_wait(e, attempt, started, func.__name__)
+                        if wait is None:
+                            raise
+                        await asyncio.sleep(wait)
+
+            return async_wrapper  # type: ignore
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            metrics.incr("calls")
+            started = time.monotonic()
             for attempt in range(1, retries + 1):
                 try:
-                    logging.info(f"Attempt {attempt}/{retries} for {func.__name__}")
+                    logger.info(f"Attempt {attempt}/{retries} for {func.__name__}")
                     return func(*args, **kwargs)
-                except (sqlite3.OperationalError, sqlite3.DatabaseError) as e:
-                    logging.warning(
-                        f"Transient error on attempt {attempt} for {func.__name__}: {e}"
-                    )
-                    if attempt < retries:
-                        logging.info(f"Retrying in {delay} seconds...")
-                        time.sleep(delay)
-                    else:
-                        logging.error(
-                            f"Operation failed after {retries} retries: {func.__name__}"
-                        )
+                except Exception as e:
+                    wait = next_wait(e, attempt, started, func.__name__)
+                    if wait is None:
                         raise
+                    time.sleep(wait)
 
         return wrapper  # type: ignore
 
@@ -113,6 +278,7 @@ def retry_on_failure(retries: int = 3, delay: int = 2) -> Callable[[F], F]:
 # ------------------------------
 # Usage
 # ------------------------------
+@circuit_breaker()
 @with_db_connection
 @retry_on_failure(retries=3, delay=1)
 def fetch_users_with_retry(conn: Optional[sqlite3.Connection] = None):
@@ -122,18 +288,56 @@ def fetch_users_with_retry(conn: Optional[sqlite3.Connection] = None):
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM users")
         users = cursor.fetchall()
-        logging.info(f"Fetched {len(users)} users successfully.")
+        logger.info(f"Fetched {len(users)} users successfully.")
+        return users
+
+
+def iter_users_with_retry(
+    chunk_size: int = DEFAULT_CHUNK_SIZE, row_factory: RowFactory = None
+) -> Iterator[Any]:
+    """
+    Stream all users in chunks, retrying transient errors on open.
+
+    Only executing the query and fetching the first chunk are retried;
+    once rows have been handed to the caller a failure propagates, because
+    restarting would yield duplicates.
+    """
+    return stream_query(
+        "SELECT * FROM users",
+        chunk_size=chunk_size,
+        row_factory=row_factory,
+        retry=retry_on_failure(retries=3, delay=1),
+    )
+
+
+@circuit_breaker()
+@with_db_connection
+@retry_on_failure(retries=3, delay=1)
+async def async_fetch_users_with_retry(conn: Optional[aiosqlite.Connection] = None):
+    """Fetch all users with retry logic, backing off without blocking the loop."""
+
+    if conn:
+        async with conn.execute("SELECT * FROM users") as cursor:
+            users = await cursor.fetchall()
+        logger.info(f"Fetched {len(users)} users successfully.")
         return users
 
 
 if __name__ == "__main__":
+    import asyncio
+
+    configure("retry_queries.log")
+    set_instrumentation(logging_hook)
     users = fetch_users_with_retry()
     print(users)
+    print(asyncio.run(async_fetch_users_with_retry()))
+    print(sum(1 for _ in iter_users_with_retry(row_factory="namedtuple")))
+    print(retry_metrics.snapshot())
+    print(get_breaker().snapshot())
 
 
 # Sample output
-# 2025-11-09 01:20:01,493 [INFO] Opened database connection to 'users.db'
 # 2025-11-09 01:20:01,493 [INFO] Attempt 1/3 for fetch_users_with_retry
-# 2025-11-09 01:20:01,495 [INFO] Fetched 3 users successfully.
-# 2025-11-09 01:20:01,495 [INFO] Closed database connection to 'users.db'
+# 2025-11-09 01:20:01,494 [INFO] Fetched 3 users successfully.
+# 2025-11-09 01:20:01,494 [INFO] fetch_users_with_retry used 'users.db' for 0.721 ms
 # [(1, 'Alice Johnson', 'Crawford_Cartwright@hotmail.com', '2025-11-08 18:59:14'), (2, 'Bob Smith', 'bob@example.com', '2025-11-08 18:59:14'), (3, 'Charlie Lee', 'charlie@example.com', '2025-11-08 18:59:14')]
@@ -1,32 +1,45 @@
+from __future__ import annotations
+
+import time
 import sqlite3
 import functools
+import inspect
 import logging
-from typing import cast, Any, Callable, TypeVar, Optional, Dict, Sequence, Tuple
-from pathlib import Path
-from datetime import datetime
-
-# -------------------------------
-# Configure logger
-# -------------------------------
+import weakref
+import threading
+import collections
+from typing import (
+    TYPE_CHECKING,
+    cast,
+    Any,
+    Callable,
+    TypeVar,
+    Optional,
+    Dict,
+    Iterator,
+    Sequence,
+    Tuple,
+)
 
-today_str = datetime.now().strftime("%Y-%m-%d")
-LOG_DIR = Path("logs") / today_str
-LOG_DIR.mkdir(exist_ok=True)
+from db_decorators import (
+    DB_PATH,
+    PackedResult,
+    logging_hook,
+    result_nbytes,
+    set_instrumentation,
+    with_db_connection,
+)
 
-LOG_FILE = LOG_DIR / "cache_queries.log"
+from logging_config import configure
+from query_metrics import registry
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-    ],
-)
+if TYPE_CHECKING:
+    import asyncio
+    import aiosqlite
+    from db_decorators.l2cache import L2Cache
 
 logger = logging.getLogger(__name__)
 
-
 # ------------------------
 # Typing aliases
 # ------------------------
@@ -37,58 +50,307 @@ F = TypeVar("F", bound=Callable[..., Any])  # generic for decorator typing
 # ------------------------
 # In-memory cache
 # ------------------------
-# Key: SQL query string, Value: QueryResult
-query_cache: Dict[str, QueryResult] = {}
+# Default memory budget for cached results in this process
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
 
 
-# -------------------------------
-# Database Connection Decorator
-# -------------------------------
-def with_db_connection(func: F) -> F:
-    """Decorator to manage SQLite database connection."""
+class ResultCache:
+    """
+    Query -> result mapping bounded by the bytes its results occupy.
 
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn: sqlite3.Connection | None = None
-        try:
-            conn = sqlite3.connect("users.db")
-            logger.info("Database connection established.")
-            return func(conn, *args, **kwargs)
-        finally:
-            if conn is not None:
-                conn.close()
-                logger.info("Database connection closed.")
+    Each entry is charged its `result_nbytes`; inserting past `max_bytes`
+    evicts least recently used entries first. Results larger than the
+    whole budget are returned to the caller but not cached.
+    """
 
-    return cast(F, wrapper)
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.evictions = 0
+        self._entries: "collections.OrderedDict[str, Tuple[QueryResult, int]]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, query: str) -> Optional[QueryResult]:
+        """Return the cached result and mark it recently used."""
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is None:
+                return None
+            self._entries.move_to_end(query)
+            return entry[0]
+
+    def __setitem__(self, query: str, result: QueryResult) -> None:
+        size = result_nbytes(result)
+        with self._lock:
+            old = self._entries.pop(query, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            if size > self.max_bytes:
+                return
+            while self._entries and self.nbytes + size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+            self._entries[query] = (result, size)
+            self.nbytes += size
+
+    def __getitem__(self, query: str) -> QueryResult:
+        result = self.get(query)
+        if result is None:
+            raise KeyError(query)
+        return result
+
+    def __contains__(self, query: object) -> bool:
+        return query in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def pop(self, query: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(query, None)
+            if entry is None:
+                return default
+            self.nbytes -= entry[1]
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+# Key: SQL query string, Value: QueryResult (a PackedResult when packable)
+query_cache = ResultCache()
+
+# Per event loop, one lock per in-flight query so concurrent async misses
+# execute it only once. Locks bind to a loop, hence the outer mapping; an
+# entry is dropped as soon as its query has been filled.
+_async_cache_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+
+# Optional persistent tier behind `query_cache`; see `enable_l2_cache`
+l2_cache: Optional[L2Cache] = None
+
+# Bumped by `invalidate`; a miss only fills L1 if no invalidation ran meanwhile
+_invalidations = 0
+
+
+def enable_l2_cache(
+    path: str = ".query_cache.sqlite", ttl: float = 300.0, namespace: str = DB_PATH
+) -> L2Cache:
+    """Turn on the on-disk L2 tier shared by every process on this host."""
+    from db_decorators.l2cache import L2Cache
+
+    global l2_cache
+    l2_cache = L2Cache(path, ttl=ttl, namespace=namespace)
+    return l2_cache
+
+
+def invalidate(*tables: str) -> None:
+    """
+    Drop cached results that read any of `tables`.
+
+    Call after writing to those tables. L1 entries in this process are
+    removed directly; L2 entries in every process are invalidated by
+    bumping the tables' generation counters.
+    """
+    from db_decorators.l2cache import referenced_tables
+
+    global _invalidations
+    _invalidations += 1
+    names = {t.lower() for t in tables}
+    for query in list(query_cache):
+        if names.intersection(referenced_tables(query) or ()):
+            query_cache.pop(query, None)
+    if l2_cache is not None:
+        l2_cache.bump(*names)
 
 
 # -------------------------------
 # Query Caching Decorator
 # -------------------------------
+def _freeze(result: QueryResult) -> QueryResult:
+    """
+    Store the result once, immutably: packed into one shared buffer when
+    the rows are plain SQL values, otherwise as a tuple of rows.
+    """
+    try:
+        rows = tuple(result)
+    except Exception:
+        # fallback: store whatever was returned
+        return result
+    packed = PackedResult.pack(rows)
+    return packed if packed is not None else rows
+
+
+def _referenced_tables(query: str) -> Optional[Tuple[str, ...]]:
+    """Tables `query` reads, or None if it cannot be cached safely."""
+    from db_decorators.l2cache import referenced_tables
+
+    return referenced_tables(query)
+
+
+def _run_uncached(func: Callable[..., Any], conn: Any, query: str, *args, **kwargs):
+    """Run a query whose tables cannot be determined, bypassing both tiers."""
+    started = time.perf_counter()
+    try:
+        result = func(conn, query, *args, **kwargs)
+    except Exception:
+        registry.record(query, time.perf_counter() - started, error=True)
+        raise
+    registry.record(query, time.perf_counter() - started)
+    logger.info("Query not cacheable (tables unknown): %s", query)
+    return result
+
+
+async def _run_uncached_async(
+    func: Callable[..., Any], conn: Any, query: str, *args, **kwargs
+):
+    """`_run_uncached` for coroutine functions."""
+    started = time.perf_counter()
+    try:
+        result = await func(conn, query, *args, **kwargs)
+    except Exception:
+        registry.record(query, time.perf_counter() - started, error=True)
+        raise
+    registry.record(query, time.perf_counter() - started)
+    logger.info("Query not cacheable (tables unknown): %s", query)
+    return result
+
+
+def _query_lock(query: str) -> Tuple[Dict[str, asyncio.Lock], asyncio.Lock]:
+    """Return the running loop's lock table and the lock for `query`."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    locks = _async_cache_locks.get(loop)
+    if locks is None:
+        locks = _async_cache_locks[loop] = {}
+    lock = locks.get(query)
+    if lock is None:
+        lock = locks[query] = asyncio.Lock()
+    return locks, lock
+
+
 def cache_query(func: F) -> F:
-    """Decorator to cache database query results based on the SQL query string."""
+    """Decorator to cache database query results based on the SQL query string.
+
+    Coroutine functions share the same cache; a per-query asyncio.Lock makes
+    concurrent misses wait for a single execution instead of stampeding.
+    Results are stored once as an immutable `PackedResult` and every hit
+    returns that same read-only view, so callers need no defensive copies.
+    The cache is bounded by bytes (`query_cache.max_bytes`) with LRU
+    eviction. Misses are timed into `query_metrics.registry`. When `enable_l2_cache`
+    has been called, L1 misses consult the persistent L2 tier before
+    running the query, so restarts and fresh workers start warm.
+    Queries whose tables cannot be determined (subqueries, comma joins)
+    are never cached, since `invalidate` could not reach them.
+    """
+
+    if inspect.iscoroutinefunction(func):
+
+        async def fill(
+            conn: aiosqlite.Connection, query: str, *args, **kwargs
+        ) -> QueryResult:
+            """Serve from L2 or run the query; called holding the query's lock."""
+            import asyncio
+
+            # another task may have filled the entry while we waited
+            hit = query_cache.get(query)
+            if hit is not None:
+                logger.info("⚡ Cache hit for query: %s", query)
+                return hit
+            tables = _referenced_tables(query)
+            if tables is None:
+                return await _run_uncached_async(func, conn, query, *args, **kwargs)
+            l2 = l2_cache
+            snapshot: Dict[str, int] = {}
+            if l2 is not None:
+                stored = await asyncio.to_thread(l2.get, query)
+                if stored is not None:
+                    logger.info("💾 L2 cache hit for query: %s", query)
+                    query_cache[query] = stored
+                    return stored
+                snapshot = await asyncio.to_thread(l2.generations, tables)
+            seen = _invalidations
+            started = time.perf_counter()
+            try:
+                result = await func(conn, query, *args, **kwargs)
+            except Exception:
+                registry.record(query, time.perf_counter() - started, error=True)
+                raise
+            registry.record(query, time.perf_counter() - started)
+            cached = _freeze(result)
+            if seen == _invalidations:
+                query_cache[query] = cached
+            if l2 is not None:
+                await asyncio.to_thread(l2.set, query, cached, snapshot)
+            logger.info("🗄️  Cache miss — query executed and cached: %s", query)
+            return cached
+
+        @functools.wraps(func)
+        async def async_wrapper(
+            conn: aiosqlite.Connection, query: str, *args, **kwargs
+        ) -> QueryResult:
+            hit = query_cache.get(query)
+            if hit is not None:
+                logger.info("⚡ Cache hit for query: %s", query)
+                return hit
+
+            locks, lock = _query_lock(query)
+            async with lock:
+                try:
+                    return await fill(conn, query, *args, **kwargs)
+                finally:
+                    # Waiters keep their reference; newcomers will hit the cache
+                    if locks.get(query) is lock:
+                        del locks[query]
+
+        return cast(F, async_wrapper)
 
     @functools.wraps(func)
     def wrapper(conn: sqlite3.Connection, query: str, *args, **kwargs) -> QueryResult:
-        if query in query_cache:
+        hit = query_cache.get(query)
+        if hit is not None:
             i = "⚡"
             logger.info("%s Cache hit for query: %s", i, query)
-            return query_cache[query]
+            return hit
 
-        result = func(conn, query, *args, **kwargs)
-        query_cache[query] = result
-        i = "🗄️"
-        logger.info("%s  Cache miss — query executed and cached: %s", i, query)
+        tables = _referenced_tables(query)
+        if tables is None:
+            return _run_uncached(func, conn, query, *args, **kwargs)
+        l2 = l2_cache
+        snapshot: Dict[str, int] = {}
+        if l2 is not None:
+            stored = l2.get(query)
+            if stored is not None:
+                logger.info("💾 L2 cache hit for query: %s", query)
+                query_cache[query] = stored
+                return stored
+            # Read before executing: a concurrent bump must make this entry stale
+            snapshot = l2.generations(tables)
 
-        # store a shallow immutable copy (tuple of rows) to avoid accidental mutation
+        seen = _invalidations
+        started = time.perf_counter()
         try:
-            # convert to tuple for immutability, but keep row tuples as-is
-            cached: QueryResult = tuple(result)  # type: ignore[assignment]
+            result = func(conn, query, *args, **kwargs)
         except Exception:
-            # fallback: store whatever was returned
-            cached = result
+            registry.record(query, time.perf_counter() - started, error=True)
+            raise
+        registry.record(query, time.perf_counter() - started)
+        i = "🗄️"
+        logger.info("%s  Cache miss — query executed and cached: %s", i, query)
 
-        query_cache[query] = cached
+        cached = _freeze(result)
+        if seen == _invalidations:
+            query_cache[query] = cached
+        if l2 is not None:
+            l2.set(query, cached, snapshot)
         return cached
 
     return cast(F, wrapper)
@@ -110,23 +372,46 @@ def fetch_users_with_cache(
         return rows
 
 
+@with_db_connection
+@cache_query
+async def async_fetch_users_with_cache(
+    conn: Optional[aiosqlite.Connection] = None, query: str = ""
+) -> Optional[QueryResult]:
+    """Fetch users asynchronously using a SQL query with caching enabled."""
+    if conn:
+        async with conn.execute(query) as cursor:
+            return await cursor.fetchall()
+
+
 # -------------------------------
 # Usage
 # -------------------------------
 if __name__ == "__main__":
+    import asyncio
+
+    configure("cache_queries.log")
+    set_instrumentation(logging_hook)
+    enable_l2_cache()
     # First call will cache the result
     users = fetch_users_with_cache(query="SELECT * FROM users")
 
     # Second call will use the cached result
     users_again = fetch_users_with_cache(query="SELECT * FROM users")
 
-    print(users_again)
+    print(list(users_again), f"({users_again.nbytes} bytes cached)")
+
+    # After a write, drop dependent entries here and in every other process
+    invalidate("users")
+
+    # Async callers share the same cache
+    print(asyncio.run(async_fetch_users_with_cache(query="SELECT * FROM users")))
 
 # Sample Output
-# 2025-11-09 02:10:55,200 [INFO] Database connection established.
 # 2025-11-09 02:10:55,201 [INFO] 🗄️  Cache miss — query executed and cached: SELECT * FROM users
-# 2025-11-09 02:10:55,201 [INFO] Database connection closed.
-# 2025-11-09 02:10:55,202 [INFO] Database connection established.
+# 2025-11-09 02:10:55,201 [INFO] fetch_users_with_cache used 'users.db' for 3.120 ms
 # 2025-11-09 02:10:55,202 [INFO] ⚡ Cache hit for query: SELECT * FROM users
-# 2025-11-09 02:10:55,202 [INFO] Database connection closed.
-# ((1, 'Alice Johnson', 'Crawford_Cartwright@hotmail.com', '2025-11-08 18:59:14'), (2, 'Bob Smith', 'bob@example.com', '2025-11-08 18:59:14'), (3, 'Charlie Lee', 'charlie@example.com', '2025-11-08 18:59:14'))
+# 2025-11-09 02:10:55,202 [INFO] fetch_users_with_cache used 'users.db' for 0.065 ms
+# [(1, 'Alice Johnson', 'Crawford_Cartwright@hotmail.com', '2025-11-08 18:59:14'), (2, 'Bob Smith', 'bob@example.com', '2025-11-08 18:59:14'), (3, 'Charlie Lee', 'charlie@example.com', '2025-11-08 18:59:14')] (226 bytes cached)
+# 2025-11-09 02:10:55,212 [INFO] 🗄️  Cache miss — query executed and cached: SELECT * FROM users
+# 2025-11-09 02:10:55,212 [INFO] async_fetch_users_with_cache used 'users.db' for 9.976 ms
+# PackedResult(rows=3, nbytes=226)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the decorator stack.
+
+Measures, in nanoseconds per call (best of several `timeit` repeats):
+
+- each decorator layer on its own, wrapped around a no-op body,
+- the composed stack (`circuit_breaker` + `with_db_connection` +
+  `retry_on_failure` + `transactional`),
+- a `cache_query` hit,
+- a pool checkout/return,
+- an end-to-end point query, against an in-memory and an on-disk database.
+
+With `--compare`, each case also reports its overhead over the same work
+done undecorated on a plain connection. `--json` writes the results with
+interpreter and SQLite versions so runs can be tracked over time.
+
+Usage:
+    python benchmarks.py
+    python benchmarks.py --compare --json bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import sqlite3
+import logging
+import argparse
+import platform
+import tempfile
+import importlib.util
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+
+from db_decorators import (  # noqa: E402
+    CircuitBreaker,
+    get_pool,
+    with_db_connection,
+)
+
+DEFAULT_ROWS = 10_000
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.05
+
+# Shared-cache URI so every pooled connection sees the same in-memory data
+MEMORY_DB = "file:bench_users?mode=memory&cache=shared"
+
+
+def load_task(filename: str) -> Any:
+    """Import a task module whose file name is not a valid identifier."""
+    name = Path(filename).stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, HERE / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+def seed_users(conn: sqlite3.Connection, rows: int) -> None:
+    """Create and fill the `users` table the task modules query."""
+    conn.execute(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INT)"
+    )
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+            ((f"User {n}", f"user{n}@example.com", 18 + n % 80) for n in range(rows)),
+        )
+
+
+def time_call(func: Callable[[], Any], repeat: int, min_time: float) -> float:
+    """
+    Return the best per-call time of `func` in nanoseconds.
+
+    The loop count is doubled until one repeat takes at least `min_time`
+    seconds, then the fastest of `repeat` runs is kept.
+    """
+    timer = timeit.Timer(func, timer=time.perf_counter_ns)
+    number = 1
+    while timer.timeit(number) < min_time * 1e9:
+        number *= 2
+    return min(timer.repeat(repeat, number)) / number
+
+
+# -------------------------------
+# Benchmark cases
+# -------------------------------
+def build_cases(db_path: str) -> Dict[str, Dict[str, Callable[[], Any]]]:
+    """
+    Return {case: {"decorated": fn, "baseline": fn}} for one database.
+
+    Every decorated case does the same work as its baseline, so the
+    difference is what the decorators add.
+    """
+    log_queries = load_task("0-log_queries.py").log_queries
+    transactional = load_task("2-transactional.py").transactional
+    retry_mod = load_task("3-retry_on_failure.py")
+    cache_mod = load_task("4-cache_query.py")
+    retry_on_failure = retry_mod.retry_on_failure
+    breaker = CircuitBreaker(f"bench:{db_path}")
+
+    plain = sqlite3.connect(db_path, uri=db_path.startswith("file:"))
+
+    def noop(conn: Optional[sqlite3.Connection] = None) -> None:
+        return None
+
+    def point(conn: Optional[sqlite3.Connection] = None, user_id: int = 1):
+        return conn.execute(  # type: ignore[union-attr]
+            "SELECT * FROM users WHERE id = ?", (user_id,)
+        ).fetchone()
+
+    def noop_query(query: str = "") -> None:
+        return None
+
+    def cached_point(conn: sqlite3.Connection, query: str):
+        return conn.execute(query).fetchall()
+
+    retry = retry_on_failure(retries=3, delay=0, budget=None)
+    connected = with_db_connection(db_path=db_path)
+    logged_noop = log_queries(sample_rate=0.0, slow_ms=1e9)(noop_query)
+    connected_noop = connected(noop)
+    transactional_noop = transactional(noop)
+    retry_noop = retry(noop)
+    breaker_noop = breaker(noop)
+    connected_point = connected(point)
+    stack = breaker(connected(retry(transactional(point))))
+    cached = connected(cache_mod.cache_query(cached_point))
+    cached_query = "SELECT * FROM users WHERE id = 1"
+    cached(query=cached_query)  # fill the cache
+    pool = get_pool(db_path)
+
+    def checkout() -> None:
+        pool.release(pool.acquire())
+
+    return {
+        "log_queries (noop)": {
+            "decorated": lambda: logged_noop(query="SELECT 1"),
+            "baseline": lambda: noop_query(query="SELECT 1"),
+        },
+        "with_db_connection (noop)": {
+            "decorated": connected_noop,
+            "baseline": lambda: noop(plain),
+        },
+        "transactional (noop)": {
+            "decorated": lambda: transactional_noop(plain),
+            "baseline": lambda: noop(plain),
+        },
+        "retry_on_failure (noop)": {
+            "decorated": lambda: retry_noop(plain),
+            "baseline": lambda: noop(plain),
+        },
+        "circuit_breaker (noop)": {
+            "decorated": breaker_noop,
+            "baseline": noop,
+        },
+        "pool checkout": {
+            "decorated": checkout,
+            "baseline": lambda: None,
+        },
+        "cache_query hit": {
+            "decorated": lambda: cached(query=cached_query),
+            "baseline": lambda: cached_point(plain, cached_query),
+        },
+        "point query": {
+            "decorated": lambda: connected_point(user_id=1),
+            "baseline": lambda: point(plain, 1),
+        },
+        "full stack point query": {
+            "decorated": lambda: stack(user_id=1),
+            "baseline": lambda: point(plain, 1),
+        },
+    }
+
+
+def run(
+    rows: int, repeat: int, compare: bool, min_time: float = DEFAULT_MIN_TIME
+) -> Dict[str, Any]:
+    """Run every case on an in-memory and an on-disk database."""
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        disk_db = os.path.join(tmp, "users.db")
+        keeper = sqlite3.connect(MEMORY_DB, uri=True)  # keeps the memory db alive
+        for db_path, label in ((MEMORY_DB, "memory"), (disk_db, "disk")):
+            conn = keeper if label == "memory" else sqlite3.connect(disk_db)
+            seed_users(conn, rows)
+            if conn is not keeper:
+                conn.close()
+            for case, funcs in build_cases(db_path).items():
+                entry: Dict[str, Any] = {
+                    "case": case,
+                    "db": label,
+                    "ns_per_call": time_call(funcs["decorated"], repeat, min_time),
+                }
+                if compare:
+                    baseline = time_call(funcs["baseline"], repeat, min_time)
+                    entry["baseline_ns"] = baseline
+                    entry["overhead_ns"] = entry["ns_per_call"] - baseline
+                results.append(entry)
+            get_pool(db_path).close()
+        keeper.close()
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "rows": rows,
+        "repeat": repeat,
+        "min_time": min_time,
+        "results": results,
+    }
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    """Render a report as an aligned text table."""
+    compare = any("baseline_ns" in r for r in report["results"])
+    header = f"{'case':<28} {'db':<7} {'ns/call':>10}"
+    if compare:
+        header += f" {'baseline':>10} {'overhead':>10}"
+    lines = [header, "-" * len(header)]
+    for r in report["results"]:
+        line = f"{r['case']:<28} {r['db']:<7} {r['ns_per_call']:>10.0f}"
+        if compare:
+            line += f" {r['baseline_ns']:>10.0f} {r['overhead_ns']:>10.0f}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the suite and print (or save) the results."""
+    parser = argparse.ArgumentParser(description="Benchmark the decorator stack.")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=DEFAULT_MIN_TIME,
+        help="seconds each timed repeat must run for",
+    )
+    parser.add_argument(
+        "--compare", action="store_true", help="also time undecorated calls"
+    )
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    # Keep decorator log calls cheap and quiet, as in production at WARNING
+    logging.disable(logging.INFO)
+    report = run(args.rows, args.repeat, args.compare, args.min_time)
+    print(format_table(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,98 @@
+"""
+Shared database decorator library for the python-decorators-0x01 tasks.
+
+Usage:
+    from db_decorators import with_db_connection
+    from db_decorators import route_query  # reads to replicas, writes to one writer
+
+Run `python -m db_decorators` to check the decorator's call overhead
+against its budget.
+"""
+
+import importlib
+from typing import Any, Dict
+
+# Imported eagerly: `deadline` is also a submodule name, and importing that
+# submodule (connection.py does) would bind the module over a lazy export.
+from .deadline import deadline
+
+# Public name -> submodule that defines it. Submodules are imported on first
+# attribute access so a task module only pays for the parts it uses.
+_EXPORTS: Dict[str, str] = {
+    "CircuitBreaker": "circuit",
+    "CircuitOpenError": "circuit",
+    "circuit_breaker": "circuit",
+    "get_breaker": "circuit",
+    "CALL_OVERHEAD_BUDGET_NS": "connection",
+    "logging_hook": "connection",
+    "measure_call_overhead": "connection",
+    "set_instrumentation": "connection",
+    "with_db_connection": "connection",
+    "DeadlineExceeded": "deadline",
+    "check_deadline": "deadline",
+    "remaining": "deadline",
+    "PackedResult": "packed",
+    "result_nbytes": "packed",
+    "DB_PATH": "pool",
+    "DEFAULT_PRAGMAS": "pool",
+    "READ_ONLY_PRAGMAS": "pool",
+    "AsyncConnectionPool": "pool",
+    "ConnectionPool": "pool",
+    "get_pool": "pool",
+    "get_read_pool": "routing",
+    "get_write_pool": "routing",
+    "is_read_only": "routing",
+    "route_query": "routing",
+    "DEFAULT_CHUNK_SIZE": "streaming",
+    "SlotsRecord": "streaming",
+    "record_type": "streaming",
+    "stream_query": "streaming",
+    "stream_rows": "streaming",
+}
+
+
+def __getattr__(name: str) -> Any:
+    submodule = _EXPORTS.get(name)
+    if submodule is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{submodule}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> Any:
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+__all__ = [
+    "CALL_OVERHEAD_BUDGET_NS",
+    "DB_PATH",
+    "DEFAULT_CHUNK_SIZE",
+    "DEFAULT_PRAGMAS",
+    "READ_ONLY_PRAGMAS",
+    "SlotsRecord",
+    "AsyncConnectionPool",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ConnectionPool",
+    "DeadlineExceeded",
+    "PackedResult",
+    "check_deadline",
+    "circuit_breaker",
+    "deadline",
+    "get_breaker",
+    "get_pool",
+    "get_read_pool",
+    "get_write_pool",
+    "is_read_only",
+    "logging_hook",
+    "measure_call_overhead",
+    "record_type",
+    "remaining",
+    "result_nbytes",
+    "route_query",
+    "set_instrumentation",
+    "stream_query",
+    "stream_rows",
+    "with_db_connection",
+]
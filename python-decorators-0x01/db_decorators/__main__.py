@@ -0,0 +1,12 @@
+"""Check `with_db_connection` call overhead against its budget."""
+
+from .connection import CALL_OVERHEAD_BUDGET_NS, measure_call_overhead
+
+if __name__ == "__main__":
+    overhead = measure_call_overhead()
+    status = "OK" if overhead <= CALL_OVERHEAD_BUDGET_NS else "OVER BUDGET"
+    print(
+        f"with_db_connection overhead: {overhead:.0f} ns/call "
+        f"(budget {CALL_OVERHEAD_BUDGET_NS} ns) {status}"
+    )
+    raise SystemExit(0 if overhead <= CALL_OVERHEAD_BUDGET_NS else 1)
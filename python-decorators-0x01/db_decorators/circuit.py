@@ -0,0 +1,304 @@
+"""
+Circuit breaker for decorated database calls.
+
+While a database is down or locked for long periods, retrying every call
+only stacks sleeping callers on top of it. A `CircuitBreaker` watches the
+failure rate over a sliding window and, once it crosses a threshold, opens:
+calls fail immediately with `CircuitOpenError` for `reset_timeout` seconds.
+It then half-opens, letting a few probe calls through; a successful probe
+closes it again, a failed one re-opens it.
+
+Place it outside `retry_on_failure` (and `with_db_connection`) so one
+logical call, with all its retries, counts once and an open circuit skips
+the connection checkout and the retry sleeps entirely:
+
+    @circuit_breaker()
+    @with_db_connection
+    @retry_on_failure(retries=3, delay=1)
+    def fetch(conn): ...
+"""
+
+from __future__ import annotations
+
+import time
+import sqlite3
+import inspect
+import logging
+import functools
+import threading
+from typing import Any, Callable, Dict, List, TypeVar
+
+from .pool import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(sqlite3.OperationalError):
+    """Raised instead of calling through while the circuit is open."""
+
+
+def is_failure(exc: BaseException) -> bool:
+    """Default classifier: operational errors count against the database."""
+    return isinstance(exc, sqlite3.OperationalError) and not isinstance(
+        exc, CircuitOpenError
+    )
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over a sliding failure-rate window.
+
+    Args:
+        name (str): Label used in logs, usually the database path.
+        failure_rate (float): Fraction of failed calls that opens the circuit.
+        min_calls (int): Calls needed in the window before it may open.
+        window (float): Length of the sliding window in seconds.
+        buckets (int): Resolution of the window; older buckets expire whole.
+        reset_timeout (float): Seconds to stay open before probing.
+        half_open_calls (int): Concurrent probe calls allowed when half-open.
+        classifier (Callable[[BaseException], bool]): True for exceptions
+            that indicate an unhealthy database; other `Exception`s count
+            as successes. Cancellation and other `BaseException`s never
+            change the state.
+    """
+
+    def __init__(
+        self,
+        name: str = DB_PATH,
+        *,
+        failure_rate: float = 0.5,
+        min_calls: int = 10,
+        window: float = 10.0,
+        buckets: int = 10,
+        reset_timeout: float = 5.0,
+        half_open_calls: int = 1,
+        classifier: Callable[[BaseException], bool] = is_failure,
+    ) -> None:
+        self.name = name
+        # Effective options, compared by get_breaker on later lookups
+        self.settings: Dict[str, Any] = {
+            "failure_rate": failure_rate,
+            "min_calls": min_calls,
+            "window": window,
+            "buckets": buckets,
+            "reset_timeout": reset_timeout,
+            "half_open_calls": half_open_calls,
+            "classifier": classifier,
+        }
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.classifier = classifier
+        self._bucket_width = window / buckets
+        # [bucket_id, calls, failures] per slot of the ring
+        self._buckets: List[List[int]] = [[-1, 0, 0] for _ in range(buckets)]
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.trips = 0
+
+    # ---- state --------------------------------------------------------
+    @property
+    def state(self) -> str:
+        """Current state, moving open -> half-open once the timeout passed."""
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+            self._probes = 0
+
+    def _transition(self, state: str) -> None:
+        if state != self._state:
+            logger.warning(f"Circuit {self.name!r}: {self._state} -> {state}")
+            self._state = state
+
+    def _window_totals(self, now: float) -> List[int]:
+        current = int(now / self._bucket_width)
+        oldest = current - len(self._buckets) + 1
+        calls = failures = 0
+        for bucket_id, bucket_calls, bucket_failures in self._buckets:
+            if bucket_id >= oldest:
+                calls += bucket_calls
+                failures += bucket_failures
+        return [calls, failures]
+
+    def _record(self, now: float, failed: bool) -> None:
+        bucket_id = int(now / self._bucket_width)
+        bucket = self._buckets[bucket_id % len(self._buckets)]
+        if bucket[0] != bucket_id:
+            bucket[:] = [bucket_id, 0, 0]
+        bucket[1] += 1
+        bucket[2] += failed
+
+    def _reset_window(self) -> None:
+        for bucket in self._buckets:
+            bucket[:] = [-1, 0, 0]
+
+    # ---- call protocol ------------------------------------------------
+    def before_call(self) -> None:
+        """Admit a call or raise `CircuitOpenError`."""
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return
+            self.rejected += 1
+            state = self._state
+            retry_in = max(0.0, self.reset_timeout - (now - self._opened_at))
+        raise CircuitOpenError(
+            f"circuit {self.name!r} is {state}; retry in {retry_in:.1f}s"
+        )
+
+    def on_success(self) -> None:
+        """Record a successful call."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+                self._reset_window()
+                return
+            self._record(time.monotonic(), failed=False)
+
+    def on_failure(self, exc: BaseException) -> None:
+        """
+        Record a failed call.
+
+        Exceptions the `classifier` rejects count as successes, except a
+        `CircuitOpenError` from an inner breaker. Cancellation and other
+        non-`Exception`s say nothing about the database: they only give
+        back a half-open probe slot.
+        """
+        if not isinstance(exc, Exception) or (
+            isinstance(exc, CircuitOpenError) and not self.classifier(exc)
+        ):
+            self._release_probe()
+            return
+        if not self.classifier(exc):
+            self.on_success()
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._open(now)
+                return
+            self._record(now, failed=True)
+            calls, failures = self._window_totals(now)
+            if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._open(now)
+
+    def _release_probe(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _open(self, now: float) -> None:
+        self._transition(OPEN)
+        self._opened_at = now
+        self.trips += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the state and counters for monitoring."""
+        state = self.state
+        with self._lock:
+            calls, failures = self._window_totals(time.monotonic())
+            return {
+                "state": state,
+                "window_calls": calls,
+                "window_failures": failures,
+                "rejected": self.rejected,
+                "trips": self.trips,
+            }
+
+    # ---- decorator ----------------------------------------------------
+    def __call__(self, func: F) -> F:
+        """Guard `func` (sync or coroutine) with this breaker."""
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                self.before_call()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    self.on_failure(e)
+                    raise
+                self.on_success()
+                return result
+
+            return async_wrapper  # type: ignore
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self.before_call()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                self.on_failure(e)
+                raise
+            self.on_success()
+            return result
+
+        return wrapper  # type: ignore
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str = DB_PATH, **settings: Any) -> CircuitBreaker:
+    """
+    Return the process-wide breaker called `name`, creating it on first use.
+
+    `settings` are passed to `CircuitBreaker` only when it is created, so
+    every function guarding the same database shares one circuit. Passing
+    settings that differ from those of the existing breaker raises
+    `ValueError` rather than silently ignoring them.
+    """
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(name, **settings)
+                return breaker
+    missing = object()
+    conflicts = sorted(
+        key for key, value in settings.items()
+        if breaker.settings.get(key, missing) != value
+    )
+    if conflicts:
+        raise ValueError(
+            f"circuit {name!r} already exists with different settings: "
+            + ", ".join(
+                f"{key}={breaker.settings.get(key, '<unknown>')!r}, "
+                f"got {settings[key]!r}"
+                for key in conflicts
+            )
+        )
+    return breaker
+
+
+def circuit_breaker(name: str = DB_PATH, **settings: Any) -> Callable[[F], F]:
+    """
+    Decorator guarding a function with the shared breaker for `name`.
+
+    Args:
+        name (str): Breaker to use; functions sharing a name share a circuit.
+        **settings: `CircuitBreaker` options, applied on first creation;
+            later calls must pass the same values or none.
+    """
+    return get_breaker(name, **settings)
@@ -0,0 +1,173 @@
+"""
+The single `with_db_connection` implementation shared by every task module.
+
+Connections come from the per-path `ConnectionPool` (or, for coroutine
+functions, an entered `AsyncConnectionPool`), and every call can report to
+one process-wide instrumentation hook installed with `set_instrumentation`.
+"""
+
+from __future__ import annotations
+
+import time
+import sqlite3
+import inspect
+import logging
+import functools
+from typing import Any, Callable, Optional, TypeVar
+
+from .deadline import _deadline, aiosqlite_deadline, check_deadline, sqlite_deadline
+from .pool import DB_PATH, active_async_pool, get_pool
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# hook(func_name, db_path, seconds, error) called after every decorated call
+InstrumentationHook = Callable[[str, str, float, Optional[BaseException]], None]
+
+_hook: Optional[InstrumentationHook] = None
+
+# Budget for the decorator's own cost on a pool hit with no hook installed
+CALL_OVERHEAD_BUDGET_NS = 5_000
+
+
+def set_instrumentation(hook: Optional[InstrumentationHook]) -> None:
+    """
+    Install (or with None, remove) the instrumentation hook.
+
+    Args:
+        hook (Optional[InstrumentationHook]): Called with the function name,
+            database path, elapsed seconds and the exception (or None).
+    """
+    global _hook
+    _hook = hook
+
+
+def logging_hook(
+    name: str, db_path: str, seconds: float, error: Optional[BaseException]
+) -> None:
+    """Instrumentation hook that logs every decorated call at INFO level."""
+    if error is None:
+        logger.info(f"{name} used '{db_path}' for {seconds * 1000:.3f} ms")
+    else:
+        logger.warning(f"{name} failed on '{db_path}' after {seconds * 1000:.3f} ms")
+
+
+def with_db_connection(func: Optional[F] = None, *, db_path: str = DB_PATH):
+    """
+    Decorator that passes a pooled database connection as the first argument.
+
+    The connection is returned to the pool afterwards, with any uncommitted
+    work rolled back. Coroutine functions receive an `aiosqlite.Connection`,
+    checked out from an entered `AsyncConnectionPool` when one exists for
+    `db_path`, otherwise opened and closed around the call.
+
+    Inside a `deadline(...)` block the call fails fast once the budget is
+    spent, waits for a pooled connection no longer than what is left, and
+    runs its statements with `busy_timeout` and a progress-handler
+    interrupt bound to the deadline.
+
+    Args:
+        func (Optional[F]): The function when used bare (`@with_db_connection`).
+        db_path (str): Database file to connect to.
+    """
+
+    def decorator(func: F) -> F:
+        name = func.__name__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                hook = _hook
+                started = time.perf_counter() if hook else 0.0
+                error: Optional[BaseException] = None
+                pool = active_async_pool(db_path)
+                try:
+                    if _deadline.get() is not None:
+                        check_deadline(name)
+                    if pool is not None:
+                        conn = await pool.acquire()
+                        try:
+                            async with aiosqlite_deadline(conn):
+                                return await func(conn, *args, **kwargs)
+                        finally:
+                            await pool.release(conn)
+
+                    import aiosqlite
+
+                    async with aiosqlite.connect(db_path) as conn:
+                        async with aiosqlite_deadline(conn):
+                            return await func(conn, *args, **kwargs)
+                except BaseException as e:
+                    error = e
+                    if isinstance(e, sqlite3.Error):
+                        logger.error(f"Database error: {e}")
+                    raise
+                finally:
+                    if hook:
+                        hook(name, db_path, time.perf_counter() - started, error)
+
+            return async_wrapper  # type: ignore
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            hook = _hook
+            started = time.perf_counter() if hook else 0.0
+            error: Optional[BaseException] = None
+            pool = get_pool(db_path)
+            conn: Optional[sqlite3.Connection] = None
+            try:
+                # Acquire inside the try so exhaustion and deadlines are reported
+                if _deadline.get() is None:
+                    conn = pool.acquire()
+                    return func(conn, *args, **kwargs)
+                conn = pool.acquire(timeout=check_deadline(name))
+                with sqlite_deadline(conn):
+                    return func(conn, *args, **kwargs)
+            except BaseException as e:
+                error = e
+                if isinstance(e, sqlite3.Error):
+                    logger.error(f"Database error: {e}")
+                raise
+            finally:
+                if conn is not None:
+                    pool.release(conn)
+                if hook:
+                    hook(name, db_path, time.perf_counter() - started, error)
+
+        return wrapper  # type: ignore
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def measure_call_overhead(iterations: int = 100_000) -> float:
+    """
+    Return the decorator's cost per call in nanoseconds.
+
+    Compares a decorated no-op against the same no-op called with a
+    connection directly, using an in-memory database so only the
+    decorator and pool checkout are measured.
+    """
+    conn = sqlite3.connect(":memory:")
+
+    def noop(conn: sqlite3.Connection) -> None:
+        return None
+
+    decorated = with_db_connection(db_path=":memory:")(noop)
+    decorated()  # warm the pool
+
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        decorated()
+    wrapped_ns = time.perf_counter_ns() - started
+
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        noop(conn)
+    bare_ns = time.perf_counter_ns() - started
+
+    conn.close()
+    return (wrapped_ns - bare_ns) / iterations
@@ -0,0 +1,142 @@
+"""
+Per-call deadlines propagated through the decorator stack.
+
+`deadline(seconds)` sets an absolute expiry in a context variable, so it
+follows the call into every decorator and across `await`s without being
+passed around. Nested deadlines can only shorten the budget.
+
+Decorators read it to:
+
+- refuse to start work once the budget is spent (`check_deadline`),
+- bound the wait for a pooled connection,
+- set SQLite's `busy_timeout` to the remaining time and interrupt a running
+  statement through a `progress_handler` when it expires (`sqlite_deadline`),
+- skip retries whose backoff would not fit in what is left.
+"""
+
+from __future__ import annotations
+
+import time
+import sqlite3
+import contextlib
+import contextvars
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, Optional
+
+if TYPE_CHECKING:
+    import aiosqlite
+
+# Absolute time.monotonic() expiry of the current call, if any
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "db_deadline", default=None
+)
+
+# SQLite VM instructions between progress-handler checks
+PROGRESS_OPS = 1000
+
+
+class DeadlineExceeded(sqlite3.OperationalError):
+    """Raised when a call runs out of its deadline budget."""
+
+
+@contextlib.contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """
+    Give the enclosed calls at most `seconds` in total.
+
+    Yields the absolute `time.monotonic()` expiry actually in force, which
+    is earlier than requested when an outer deadline is tighter.
+    """
+    expires = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None and outer < expires:
+        expires = outer
+    token = _deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current deadline, or None when there is none."""
+    expires = _deadline.get()
+    if expires is None:
+        return None
+    return expires - time.monotonic()
+
+
+def check_deadline(what: str = "call") -> Optional[float]:
+    """Return the seconds left, raising `DeadlineExceeded` if none are."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"deadline exceeded before {what}")
+    return left
+
+
+def _progress_handler(expires: float):
+    def handler() -> int:
+        # A non-zero return makes SQLite abort with "interrupted"
+        return time.monotonic() >= expires
+
+    return handler
+
+
+def _translate(e: sqlite3.OperationalError, expires: float) -> BaseException:
+    if time.monotonic() >= expires and (
+        "interrupted" in str(e) or "locked" in str(e) or "busy" in str(e)
+    ):
+        return DeadlineExceeded(f"deadline exceeded: {e}")
+    return e
+
+
+@contextlib.contextmanager
+def sqlite_deadline(conn: sqlite3.Connection) -> Iterator[None]:
+    """
+    Bound statements on `conn` by the current deadline, if there is one.
+
+    Sets `busy_timeout` to the remaining milliseconds and installs a
+    progress handler that interrupts the running statement at expiry;
+    both are restored afterwards so pooled connections come back clean.
+    """
+    expires = _deadline.get()
+    if expires is None:
+        yield
+        return
+    left = check_deadline("query")
+    (busy_timeout,) = conn.execute("PRAGMA busy_timeout").fetchone()
+    conn.execute(f"PRAGMA busy_timeout = {max(1, int(left * 1000))}")
+    conn.set_progress_handler(_progress_handler(expires), PROGRESS_OPS)
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        error = _translate(e, expires)
+        if error is e:
+            raise
+        raise error from e
+    finally:
+        conn.set_progress_handler(None, 0)
+        conn.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+
+
+@contextlib.asynccontextmanager
+async def aiosqlite_deadline(conn: aiosqlite.Connection) -> AsyncIterator[None]:
+    """`sqlite_deadline` for aiosqlite connections."""
+    expires = _deadline.get()
+    if expires is None:
+        yield
+        return
+    left = check_deadline("query")
+    async with conn.execute("PRAGMA busy_timeout") as cursor:
+        (busy_timeout,) = await cursor.fetchone()
+    await conn.execute(f"PRAGMA busy_timeout = {max(1, int(left * 1000))}")
+    await conn.set_progress_handler(_progress_handler(expires), PROGRESS_OPS)
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        error = _translate(e, expires)
+        if error is e:
+            raise
+        raise error from e
+    finally:
+        await conn.set_progress_handler(None, 0)
+        await conn.execute(f"PRAGMA busy_timeout = {busy_timeout}")
@@ -0,0 +1,178 @@
+"""
+Persistent second-level (L2) query cache shared by processes on one host.
+
+Entries live in a small local SQLite file (WAL mode, so many processes can
+read while one writes) and are serialized with pickle protocol 5. Each
+entry remembers the generation counter of every table its query reads;
+bumping a table's generation after a write invalidates every entry that
+depends on it, in every process, without scanning the cache.
+
+Generations must be read *before* the query runs and that snapshot passed
+to `set()`: a write that bumps a table while the query is running then
+leaves the entry stamped with the old generation, so it is never served.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import json
+import time
+import pickle
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from .pool import DB_PATH
+
+DEFAULT_L2_PATH = ".query_cache.sqlite"
+
+_TABLE_REF = re.compile(
+    r"\b(?:FROM|JOIN|INTO|UPDATE|TABLE)\s+[\"`\[]?(\w+)", re.IGNORECASE
+)
+# Shapes whose tables the regex above cannot list reliably
+_SUBQUERY = re.compile(r"\(\s*(?:SELECT|WITH|VALUES)\b|^\s*WITH\b", re.IGNORECASE)
+_FROM_CLAUSE = re.compile(
+    r"\bFROM\b(.*?)(?=\bWHERE\b|\bGROUP\b|\bORDER\b|\bLIMIT\b|\bHAVING\b"
+    r"|\bUNION\b|\bEXCEPT\b|\bINTERSECT\b|\bWINDOW\b|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        generations TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        payload BLOB NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS generations (
+        name TEXT PRIMARY KEY,
+        gen INTEGER NOT NULL
+    )""",
+)
+
+
+def referenced_tables(query: str) -> Optional[Tuple[str, ...]]:
+    """
+    Return the lower-cased table names a statement reads or writes.
+
+    Returns None when the statement cannot be parsed reliably (subqueries,
+    CTEs, comma joins, or no table at all); such queries must not be
+    cached, since no table write could invalidate them.
+    """
+    if _SUBQUERY.search(query):
+        return None
+    if any("," in clause for clause in _FROM_CLAUSE.findall(query)):
+        return None
+    tables = tuple(sorted({name.lower() for name in _TABLE_REF.findall(query)}))
+    return tables or None
+
+
+class L2Cache:
+    """
+    On-disk cache tier keyed by (namespace, query).
+
+    Args:
+        path (str): SQLite file holding the cache; share it between processes.
+        ttl (float): Seconds an entry stays valid.
+        namespace (str): Distinguishes caches for different databases that
+            share one cache file; usually the database path.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_L2_PATH,
+        ttl: float = 300.0,
+        namespace: str = DB_PATH,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.namespace = namespace
+        self._local = threading.local()
+
+    # ---- connection handling ------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread, per-process connection (safe across fork)."""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def _key(self, query: str) -> str:
+        return f"{self.namespace}\x1f{query}"
+
+    def generations(self, tables: Iterable[str]) -> Dict[str, int]:
+        """Return the current generation of each of `tables`."""
+        tables = list(tables)
+        if not tables:
+            return {}
+        marks = ",".join("?" * len(tables))
+        rows = self._conn().execute(
+            f"SELECT name, gen FROM generations WHERE name IN ({marks})",
+            [self._table_key(t) for t in tables],
+        )
+        found = {name.split("\x1f", 1)[1]: gen for name, gen in rows}
+        return {table: found.get(table, 0) for table in tables}
+
+    def _table_key(self, table: str) -> str:
+        return f"{self.namespace}\x1f{table}"
+
+    # ---- public API ---------------------------------------------------
+    def get(self, query: str) -> Optional[Any]:
+        """Return the cached value for `query`, or None if absent or stale."""
+        row = self._conn().execute(
+            "SELECT generations, expires_at, payload FROM entries WHERE key = ?",
+            (self._key(query),),
+        ).fetchone()
+        if row is None:
+            return None
+        generations, expires_at, payload = row
+        if expires_at < time.time():
+            return None
+        stored = json.loads(generations)
+        if self.generations(stored) != stored:
+            return None
+        return pickle.loads(payload)
+
+    def set(self, query: str, value: Any, generations: Mapping[str, int]) -> None:
+        """
+        Store `value` for `query`, stamped with `generations`.
+
+        Args:
+            query (str): The cached statement.
+            value (Any): Its result.
+            generations (Mapping[str, int]): `generations(referenced_tables(query))`
+                as read before the query ran.
+        """
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries (key, generations, expires_at, payload) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                self._key(query),
+                json.dumps(dict(generations)),
+                time.time() + self.ttl,
+                pickle.dumps(value, protocol=5),
+            ),
+        )
+
+    def bump(self, *tables: str) -> None:
+        """Invalidate every entry that read any of `tables`, in all processes."""
+        conn = self._conn()
+        for table in tables:
+            conn.execute(
+                "INSERT INTO generations (name, gen) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET gen = gen + 1",
+                (self._table_key(table.lower()),),
+            )
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        cursor = self._conn().execute(
+            "DELETE FROM entries WHERE expires_at < ?", (time.time(),)
+        )
+        return cursor.rowcount
@@ -0,0 +1,138 @@
+"""
+Compact, immutable storage for cached query results.
+
+`PackedResult.pack(rows)` encodes every row once into a single `bytes`
+buffer (one `marshal` record per row) plus an offsets array. Rows are
+decoded lazily on access, so a cached table costs roughly its encoded size
+instead of one tuple and one object per value, and every caller shares the
+same buffer. Slicing returns another view over that buffer without copying,
+and `nbytes` gives the exact footprint for cache accounting.
+"""
+
+from __future__ import annotations
+
+import sys
+import array
+import marshal
+from typing import Any, Iterator, Optional, Sequence, Tuple, Union, overload
+
+Row = Tuple[Any, ...]
+
+# Types a row may contain and still be packed (what sqlite3 returns)
+_PACKABLE = (type(None), int, float, str, bytes)
+
+
+class PackedResult(Sequence[Row]):
+    """
+    Read-only sequence of rows backed by one shared buffer.
+
+    Build with `PackedResult.pack`; rows come back as fresh tuples, so
+    callers can never alter the cached data.
+    """
+
+    __slots__ = ("_data", "_offsets")
+
+    def __init__(self, data: memoryview, offsets: memoryview) -> None:
+        self._data = data
+        self._offsets = offsets
+
+    @classmethod
+    def pack(cls, rows: Sequence[Row]) -> Optional["PackedResult"]:
+        """Pack `rows`, or return None if any value is not a plain SQL type."""
+        offsets = array.array("q", [0])
+        parts = []
+        end = 0
+        for row in rows:
+            if type(row) is not tuple:
+                return None
+            for value in row:
+                if type(value) not in _PACKABLE:
+                    return None
+            encoded = marshal.dumps(row)
+            parts.append(encoded)
+            end += len(encoded)
+            offsets.append(end)
+        data = b"".join(parts)
+        return cls(memoryview(data), memoryview(offsets))
+
+    # ---- Sequence protocol --------------------------------------------
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @overload
+    def __getitem__(self, index: int) -> Row: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "PackedResult": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Row, "PackedResult"]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                rows = [self[i] for i in range(start, stop, step)]
+                return PackedResult.pack(rows)  # type: ignore[return-value]
+            stop = max(start, stop)
+            return PackedResult(self._data, self._offsets[start : stop + 1])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PackedResult index out of range")
+        offsets = self._offsets
+        return marshal.loads(self._data[offsets[index] : offsets[index + 1]])
+
+    def __iter__(self) -> Iterator[Row]:
+        data, loads = self._data, marshal.loads
+        offsets = self._offsets
+        for i in range(len(offsets) - 1):
+            yield loads(data[offsets[i] : offsets[i + 1]])
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (PackedResult, tuple, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"PackedResult(rows={len(self)}, nbytes={self.nbytes})"
+
+    # ---- Buffer access ------------------------------------------------
+    @property
+    def buffer(self) -> memoryview:
+        """Read-only view of the encoded rows this result spans."""
+        offsets = self._offsets
+        if len(offsets) == 1:
+            return self._data[0:0].toreadonly()
+        return self._data[offsets[0] : offsets[-1]].toreadonly()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by this result: encoded rows plus the offsets index."""
+        return len(self.buffer) + self._offsets.nbytes
+
+    def __reduce__(self):
+        # Rebase offsets so a pickled slice carries only its own rows
+        base = self._offsets[0]
+        offsets = array.array("q", (o - base for o in self._offsets))
+        return (_unpickle, (bytes(self.buffer), offsets.tobytes()))
+
+
+def _unpickle(data: bytes, offsets: bytes) -> PackedResult:
+    index = array.array("q")
+    index.frombytes(offsets)
+    return PackedResult(memoryview(data), memoryview(index))
+
+
+def result_nbytes(result: Any) -> int:
+    """Approximate footprint of a cached result, exact for `PackedResult`."""
+    if isinstance(result, PackedResult):
+        return result.nbytes
+    size = sys.getsizeof(result)
+    try:
+        for row in result:
+            size += sys.getsizeof(row)
+            if isinstance(row, tuple):
+                size += sum(sys.getsizeof(value) for value in row)
+    except TypeError:
+        pass
+    return size
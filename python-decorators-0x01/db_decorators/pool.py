@@ -0,0 +1,308 @@
+"""
+Connection pools used by `with_db_connection`.
+
+`ConnectionPool` keeps reusable `sqlite3` connections per database path so
+a decorated call does not pay for connect/close, and the page cache and
+pragmas survive between calls. `AsyncConnectionPool` does the same for
+aiosqlite; because every aiosqlite connection owns a worker thread it is
+scoped explicitly with `async with` rather than living for the process.
+"""
+
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+import contextvars
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import asyncio
+    import aiosqlite
+
+DB_PATH = "users.db"
+
+# Applied to every new connection; WAL lets readers run alongside a writer
+DEFAULT_PRAGMAS: Sequence[str] = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Read-only connections cannot switch journal mode; query_only guards writes
+READ_ONLY_PRAGMAS: Sequence[str] = (
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA query_only = 1",
+)
+
+
+def read_only_uri(db_path: str) -> str:
+    """Return a `mode=ro` URI for `db_path`, suitable for `uri=True`."""
+    import urllib.parse
+
+    return f"file:{urllib.parse.quote(db_path)}?mode=ro"
+
+
+class PoolStats:
+    """Counters describing how a pool is being used."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.discarded = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the counters as a plain dict."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "waits": self.waits,
+            "discarded": self.discarded,
+        }
+
+
+# -------------------------------
+# Sync pool
+# -------------------------------
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of sqlite3 connections to one database.
+
+    Connections are created lazily up to `max_size`; callers beyond that
+    block until one is returned or `timeout` expires. With `read_only`,
+    connections are opened through a `mode=ro` URI and cannot write.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        max_size: int = 8,
+        timeout: float = 10.0,
+        pragmas: Optional[Sequence[str]] = None,
+        read_only: bool = False,
+    ) -> None:
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.read_only = read_only
+        if pragmas is None:
+            pragmas = READ_ONLY_PRAGMAS if read_only else DEFAULT_PRAGMAS
+        self.pragmas = pragmas
+        self.stats = PoolStats()
+        # LIFO keeps the hottest connection (and its page cache) in use
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection and apply the configured pragmas."""
+        if self.read_only:
+            conn = sqlite3.connect(
+                read_only_uri(self.db_path), uri=True, check_same_thread=False
+            )
+        else:
+            # "file:" paths are URIs, e.g. a shared-cache in-memory database
+            conn = sqlite3.connect(
+                self.db_path,
+                uri=self.db_path.startswith("file:"),
+                check_same_thread=False,
+            )
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """
+        Check out a connection, creating one if the pool is not full.
+
+        Waits at most `timeout` seconds (default: the pool's `timeout`) for
+        a connection to be returned when the pool is exhausted.
+        """
+        try:
+            conn = self._idle.get_nowait()
+            self.stats.hits += 1
+            return conn
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            self.stats.misses += 1
+            try:
+                return self._connect()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        self.stats.waits += 1
+        if timeout is None:
+            timeout = self.timeout
+        try:
+            return self._idle.get(timeout=max(0.0, timeout))
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"connection pool for {self.db_path!r} exhausted after {timeout}s"
+            ) from None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection, rolling back anything left uncommitted."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is dropped rather than handed out again
+            self.stats.discarded += 1
+            with self._lock:
+                self._created -= 1
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = DB_PATH) -> ConnectionPool:
+    """Return the process-wide pool for `db_path`, creating it on first use."""
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = _pools[db_path] = ConnectionPool(db_path)
+    return pool
+
+
+# -------------------------------
+# Async pool
+# -------------------------------
+class AsyncConnectionPool:
+    """
+    Bounded pool of aiosqlite connections, scoped with `async with`.
+
+    While the pool is entered, async functions decorated with
+    `with_db_connection` for the same path check connections out of it
+    instead of opening a new aiosqlite connection (and thread) per call.
+    With `read_only`, connections are opened through a `mode=ro` URI and
+    the pool serves the reads of `route_query` instead.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        max_size: int = 8,
+        pragmas: Optional[Sequence[str]] = None,
+        read_only: bool = False,
+    ) -> None:
+        self.db_path = db_path
+        self.max_size = max_size
+        self.read_only = read_only
+        if pragmas is None:
+            pragmas = READ_ONLY_PRAGMAS if read_only else DEFAULT_PRAGMAS
+        self.pragmas = pragmas
+        self.stats = PoolStats()
+        self._idle: Optional["asyncio.LifoQueue[aiosqlite.Connection]"] = None
+        self._all: List["aiosqlite.Connection"] = []
+        self._size = 0
+        self._token: Optional[contextvars.Token] = None
+
+    async def __aenter__(self) -> "AsyncConnectionPool":
+        import asyncio
+
+        self._idle = asyncio.LifoQueue()
+        key = (self.db_path, self.read_only)
+        self._token = _active_async_pools.set(
+            {**_active_async_pools.get(), key: self}
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._token is not None:
+            _active_async_pools.reset(self._token)
+            self._token = None
+        await self.close()
+
+    async def acquire(self, timeout: Optional[float] = None) -> "aiosqlite.Connection":
+        """
+        Check out a connection, waiting if the pool is at capacity.
+
+        Waits at most `timeout` seconds (default: no limit) for a connection
+        to be returned when the pool is exhausted.
+        """
+        import asyncio
+        import aiosqlite
+
+        assert self._idle is not None, "use 'async with AsyncConnectionPool()'"
+        if not self._idle.empty():
+            self.stats.hits += 1
+            return self._idle.get_nowait()
+        if self._size < self.max_size:
+            self.stats.misses += 1
+            self._size += 1
+            try:
+                if self.read_only:
+                    conn = await aiosqlite.connect(
+                        read_only_uri(self.db_path), uri=True
+                    )
+                else:
+                    conn = await aiosqlite.connect(self.db_path)
+                for pragma in self.pragmas:
+                    await conn.execute(pragma)
+            except BaseException:
+                self._size -= 1
+                raise
+            self._all.append(conn)
+            return conn
+        self.stats.waits += 1
+        if timeout is None:
+            return await self._idle.get()
+        try:
+            return await asyncio.wait_for(self._idle.get(), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            raise sqlite3.OperationalError(
+                f"connection pool for {self.db_path!r} exhausted after {timeout}s"
+            ) from None
+
+    async def release(self, conn: "aiosqlite.Connection") -> None:
+        """Return a connection, rolling back anything left uncommitted."""
+        assert self._idle is not None
+        if conn.in_transaction:
+            await conn.rollback()
+        self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+        """Close every connection owned by the pool."""
+        conns, self._all = self._all, []
+        self._size = 0
+        for conn in conns:
+            await conn.close()
+
+
+# Entered pools keyed by (db_path, read_only)
+_active_async_pools: contextvars.ContextVar[
+    Dict[Tuple[str, bool], AsyncConnectionPool]
+] = contextvars.ContextVar("active_async_pools", default={})
+
+
+def active_async_pool(
+    db_path: str, read_only: bool = False
+) -> Optional[AsyncConnectionPool]:
+    """Return the async pool entered for `db_path` in this context, if any."""
+    return _active_async_pools.get().get((db_path, read_only))
@@ -0,0 +1,255 @@
+"""
+Route decorated calls to a read-only reader pool or a single writer.
+
+Under WAL any number of readers can run alongside one writer, but only if
+they use separate connections. `route_query` classifies the statement a
+call is about to run: read-only statements check out a `mode=ro`
+connection from a per-path reader pool, everything else is serialized
+through one writer connection, so reads scale across threads without
+contending with writes for the same connection.
+
+Coroutine functions read through an entered
+`AsyncConnectionPool(db_path, read_only=True)` and write through an entered
+writer `AsyncConnectionPool`; without one they open a connection per call.
+Async writes to one database are serialized by a per-event-loop lock, so
+there is still only one writer at a time whatever pool size is entered.
+Both paths honour the current `deadline(...)` like `with_db_connection`.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+import sqlite3
+import inspect
+import logging
+import weakref
+import functools
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, TypeVar
+
+from . import connection as _connection
+from .deadline import (
+    DeadlineExceeded,
+    _deadline,
+    aiosqlite_deadline,
+    check_deadline,
+    sqlite_deadline,
+)
+from .pool import DB_PATH, ConnectionPool, active_async_pool, read_only_uri
+
+if TYPE_CHECKING:
+    import asyncio
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Readers per database; writers are always a single connection
+DEFAULT_READERS = 8
+
+_LEADING_COMMENTS = re.compile(r"^(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/)*", re.DOTALL)
+_READ_KEYWORDS = frozenset({"SELECT", "WITH", "EXPLAIN", "VALUES"})
+_WRITE_KEYWORDS = re.compile(r"\b(?:INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def is_read_only(query: str) -> bool:
+    """
+    Return True if `query` only reads data.
+
+    Conservative: a WITH or EXPLAIN statement that mentions a write keyword
+    anywhere is treated as a write.
+    """
+    body = _LEADING_COMMENTS.sub("", query, count=1)
+    keyword = body.split(None, 1)[0].upper() if body else ""
+    if keyword not in _READ_KEYWORDS:
+        return False
+    if keyword != "SELECT" and _WRITE_KEYWORDS.search(body):
+        return False
+    return True
+
+
+# -------------------------------
+# Per-path reader / writer pools
+# -------------------------------
+_read_pools: Dict[str, ConnectionPool] = {}
+_write_pools: Dict[str, ConnectionPool] = {}
+_routing_lock = threading.Lock()
+
+
+def get_read_pool(db_path: str = DB_PATH) -> ConnectionPool:
+    """Return the process-wide read-only pool for `db_path`."""
+    pool = _read_pools.get(db_path)
+    if pool is None:
+        with _routing_lock:
+            pool = _read_pools.get(db_path)
+            if pool is None:
+                pool = _read_pools[db_path] = ConnectionPool(
+                    db_path, max_size=DEFAULT_READERS, read_only=True
+                )
+    return pool
+
+
+def get_write_pool(db_path: str = DB_PATH) -> ConnectionPool:
+    """Return the process-wide single-connection writer for `db_path`."""
+    pool = _write_pools.get(db_path)
+    if pool is None:
+        with _routing_lock:
+            pool = _write_pools.get(db_path)
+            if pool is None:
+                pool = _write_pools[db_path] = ConnectionPool(db_path, max_size=1)
+    return pool
+
+
+# Per event loop, one lock per database serializing route_query's async
+# writes. Locks bind to a loop, hence the outer mapping.
+_async_write_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+
+
+def _async_write_lock(db_path: str) -> "asyncio.Lock":
+    """Return the running loop's writer lock for `db_path`."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    with _routing_lock:
+        locks = _async_write_locks.get(loop)
+        if locks is None:
+            locks = _async_write_locks[loop] = {}
+        lock = locks.get(db_path)
+        if lock is None:
+            lock = locks[db_path] = asyncio.Lock()
+    return lock
+
+
+async def _acquire_write_lock(lock: "asyncio.Lock", db_path: str, name: str) -> None:
+    """Take the writer lock, waiting no longer than the current deadline."""
+    import asyncio
+
+    left = check_deadline(name) if _deadline.get() is not None else None
+    if left is None:
+        await lock.acquire()
+        return
+    try:
+        await asyncio.wait_for(lock.acquire(), left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(
+            f"deadline exceeded waiting for the writer of {db_path!r}"
+        ) from None
+
+
+def route_query(
+    func: Optional[F] = None,
+    *,
+    db_path: str = DB_PATH,
+    query_arg: str = "query",
+    read_only: Optional[bool] = None,
+):
+    """
+    Decorator that passes a reader or writer connection as the first argument.
+
+    The statement is taken from the `query_arg` keyword argument, or the
+    first positional argument when it is a string. Calls without a
+    statement go to the writer unless `read_only=True` is given. Inside a
+    `deadline(...)` block the connection wait and the statements are
+    bounded by the time left, as in `with_db_connection`.
+
+    Args:
+        func (Optional[F]): The function when used bare (`@route_query`).
+        db_path (str): Database file to connect to.
+        query_arg (str): Name of the argument holding the SQL statement.
+        read_only (Optional[bool]): Force routing instead of classifying.
+    """
+
+    def decorator(func: F) -> F:
+        name = func.__name__
+
+        def wants_reader(args: tuple, kwargs: Dict[str, Any]) -> bool:
+            if read_only is not None:
+                return read_only
+            query = kwargs.get(query_arg)
+            if query is None and args and isinstance(args[0], str):
+                query = args[0]
+            return query is not None and is_read_only(query)
+
+        if inspect.iscoroutinefunction(func):
+
+            async def call(reader: bool, args: tuple, kwargs: Dict[str, Any]):
+                import aiosqlite
+
+                left = check_deadline(name) if _deadline.get() is not None else None
+                pool = active_async_pool(db_path, read_only=reader)
+                if pool is not None:
+                    conn = await pool.acquire(timeout=left)
+                    try:
+                        async with aiosqlite_deadline(conn):
+                            return await func(conn, *args, **kwargs)
+                    finally:
+                        await pool.release(conn)
+                if reader:
+                    connect = aiosqlite.connect(read_only_uri(db_path), uri=True)
+                else:
+                    connect = aiosqlite.connect(db_path)
+                async with connect as conn:
+                    async with aiosqlite_deadline(conn):
+                        return await func(conn, *args, **kwargs)
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                hook = _connection._hook
+                started = time.perf_counter() if hook else 0.0
+                error: Optional[BaseException] = None
+                try:
+                    if wants_reader(args, kwargs):
+                        return await call(True, args, kwargs)
+                    lock = _async_write_lock(db_path)
+                    await _acquire_write_lock(lock, db_path, name)
+                    try:
+                        return await call(False, args, kwargs)
+                    finally:
+                        lock.release()
+                except BaseException as e:
+                    error = e
+                    if isinstance(e, sqlite3.Error):
+                        logger.error(f"Database error: {e}")
+                    raise
+                finally:
+                    if hook:
+                        hook(name, db_path, time.perf_counter() - started, error)
+
+            return async_wrapper  # type: ignore
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            hook = _connection._hook
+            started = time.perf_counter() if hook else 0.0
+            error: Optional[BaseException] = None
+            if wants_reader(args, kwargs):
+                pool = get_read_pool(db_path)
+            else:
+                pool = get_write_pool(db_path)
+            bounded = _deadline.get() is not None
+            conn: Optional[sqlite3.Connection] = None
+            try:
+                if not bounded:
+                    conn = pool.acquire()
+                    return func(conn, *args, **kwargs)
+                conn = pool.acquire(timeout=check_deadline(name))
+                with sqlite_deadline(conn):
+                    return func(conn, *args, **kwargs)
+            except BaseException as e:
+                error = e
+                if isinstance(e, sqlite3.Error):
+                    logger.error(f"Database error: {e}")
+                raise
+            finally:
+                if conn is not None:
+                    pool.release(conn)
+                if hook:
+                    hook(name, db_path, time.perf_counter() - started, error)
+
+        return wrapper  # type: ignore
+
+    if func is not None:
+        return decorator(func)
+    return decorator
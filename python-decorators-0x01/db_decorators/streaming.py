@@ -0,0 +1,184 @@
+"""
+Stream query results in `fetchmany` chunks instead of `fetchall`.
+
+`stream_query` is a generator that checks a pooled connection out on its
+first `next()` and returns it when the generator is exhausted, closed or
+garbage collected, so arbitrarily large reads run in constant memory.
+Rows are plain tuples by default, or lightweight records built from the
+cursor description (`row_factory="namedtuple"` / `"slots"`).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import keyword
+import functools
+import collections
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple, Union
+
+from .pool import DB_PATH, get_pool
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# None (tuples), "namedtuple", "slots", or a sqlite3-style factory(cursor, row)
+RowFactory = Union[None, str, Callable[[sqlite3.Cursor, Tuple[Any, ...]], Any]]
+
+
+# -------------------------------
+# Record types
+# -------------------------------
+class SlotsRecord:
+    """Base for per-query record classes with one slot per column."""
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __init__(self, *values: Any) -> None:
+        for name, value in zip(self._fields, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def _make(cls, values: Sequence[Any]) -> "SlotsRecord":
+        return cls(*values)
+
+    def __iter__(self) -> Iterator[Any]:
+        return (getattr(self, name) for name in self._fields)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, SlotsRecord):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{n}={getattr(self, n)!r}" for n in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+
+def _field_names(columns: Sequence[str]) -> Tuple[str, ...]:
+    """Turn column names into unique identifiers (`COUNT(*)` -> `_0`)."""
+    names = []
+    for i, column in enumerate(columns):
+        if not column.isidentifier() or keyword.iskeyword(column) or column in names:
+            column = f"_{i}"
+        names.append(column)
+    return tuple(names)
+
+
+@functools.lru_cache(maxsize=128)
+def record_type(columns: Tuple[str, ...], kind: str = "namedtuple") -> type:
+    """Return the (cached) record class for a result with these columns."""
+    fields = _field_names(columns)
+    if kind == "namedtuple":
+        return collections.namedtuple("Record", fields)
+    if kind == "slots":
+        return type("Record", (SlotsRecord,), {"__slots__": fields, "_fields": fields})
+    raise ValueError(f"unknown row_factory {kind!r}")
+
+
+# -------------------------------
+# Streaming
+# -------------------------------
+def _open_cursor(
+    conn: sqlite3.Connection,
+    query: str,
+    params: Sequence[Any],
+    chunk_size: int,
+    row_factory: RowFactory,
+) -> sqlite3.Cursor:
+    cursor = conn.cursor()
+    cursor.arraysize = chunk_size
+    if callable(row_factory):
+        cursor.row_factory = row_factory
+    try:
+        cursor.execute(query, params)
+    except BaseException:
+        cursor.close()
+        raise
+    return cursor
+
+
+def _drain(
+    cursor: sqlite3.Cursor,
+    row_factory: RowFactory,
+    first: Optional[Sequence[Any]] = None,
+) -> Iterator[Any]:
+    """Yield every remaining row of `cursor`, then close it."""
+    make = None
+    if isinstance(row_factory, str):
+        columns = tuple(d[0] for d in cursor.description or ())
+        make = record_type(columns, row_factory)._make
+    try:
+        chunk = cursor.fetchmany() if first is None else first
+        while chunk:
+            if make is None:
+                yield from chunk
+            else:
+                yield from map(make, chunk)
+            chunk = cursor.fetchmany()
+    finally:
+        cursor.close()
+
+
+def stream_rows(
+    conn: sqlite3.Connection,
+    query: str,
+    params: Sequence[Any] = (),
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    row_factory: RowFactory = None,
+) -> Iterator[Any]:
+    """
+    Run `query` on `conn` and return an iterator fetching `chunk_size` rows
+    at a time. The statement executes immediately; the cursor is closed
+    once the iterator is exhausted or closed.
+
+    Args:
+        conn (sqlite3.Connection): Connection to run the query on.
+        query (str): SQL statement.
+        params (Sequence[Any]): Bound parameters.
+        chunk_size (int): Rows per `fetchmany` call.
+        row_factory (RowFactory): Row shape; see the module docstring.
+    """
+    cursor = _open_cursor(conn, query, params, chunk_size, row_factory)
+    return _drain(cursor, row_factory)
+
+
+def stream_query(
+    query: str,
+    params: Sequence[Any] = (),
+    *,
+    db_path: str = DB_PATH,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    row_factory: RowFactory = None,
+    retry: Optional[Callable[[Callable[..., Any]], Callable[..., Any]]] = None,
+) -> Iterator[Any]:
+    """
+    Generator over `query` that owns a pooled connection while it runs.
+
+    Args:
+        query (str): SQL statement.
+        params (Sequence[Any]): Bound parameters.
+        db_path (str): Database whose pool lends the connection.
+        chunk_size (int): Rows per `fetchmany` call.
+        row_factory (RowFactory): Row shape; see the module docstring.
+        retry (Optional[Callable]): Decorator such as `retry_on_failure(...)`
+            applied to opening the stream (execute plus the first chunk).
+            Failures after rows have been yielded are never retried, since
+            the caller has already consumed part of the result.
+    """
+    pool = get_pool(db_path)
+    conn = pool.acquire()
+    try:
+
+        def start() -> Tuple[sqlite3.Cursor, Sequence[Any]]:
+            cursor = _open_cursor(conn, query, params, chunk_size, row_factory)
+            try:
+                return cursor, cursor.fetchmany()
+            except BaseException:
+                cursor.close()
+                raise
+
+        cursor, first = (retry(start) if retry else start)()
+        yield from _drain(cursor, row_factory, first)
+    finally:
+        pool.release(conn)
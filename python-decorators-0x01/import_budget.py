@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the decorator modules.
+
+Each module is imported in a fresh interpreter from an empty working
+directory, after the stdlib modules any worker already has loaded
+(logging, sqlite3, typing, ...). What is timed is therefore the cost this
+project adds at startup. Bytecode goes to a private cache that is warmed
+before timing, so the result does not depend on PYTHONDONTWRITEBYTECODE or
+on whether `__pycache__` exists yet. The check fails if an import exceeds the budget,
+creates a `logs/` folder, installs root handlers or starts extra threads.
+
+Usage:
+    python import_budget.py            # default budget
+    python import_budget.py --budget-ms 5
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+HERE = Path(__file__).resolve().parent
+MODULES = [
+    "0-log_queries.py",
+    "1-with_db_connection.py",
+    "2-transactional.py",
+    "3-retry_on_failure.py",
+    "4-cache_query.py",
+]
+DEFAULT_BUDGET_MS = 10.0
+
+# Stdlib modules a typical worker has imported before it loads the decorators
+BASELINE = "functools, inspect, itertools, json, logging, random, re, sqlite3, typing"
+
+# Runs inside the child interpreter: time only the module import itself
+_PROBE = """
+import sys, json, time, logging, threading, importlib.util
+import {baseline}
+sys.path.insert(0, {here!r})
+spec = importlib.util.spec_from_file_location("probe", {path!r})
+module = importlib.util.module_from_spec(spec)
+started = time.perf_counter()
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "ms": elapsed * 1000,
+    "root_handlers": len(logging.getLogger().handlers),
+    "threads": threading.active_count(),
+}}))
+"""
+
+
+def measure(module: str, pycache: str) -> Dict[str, float]:
+    """Import `module` in a clean subprocess and report its side effects."""
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    with tempfile.TemporaryDirectory() as cwd:
+        code = _PROBE.format(
+            baseline=BASELINE, here=str(HERE), path=str(HERE / module)
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(out.stdout)
+        result["created_logs"] = (Path(cwd) / "logs").exists()
+        return result
+
+
+def main() -> int:
+    """Print per-module import cost and return non-zero on any violation."""
+    parser = argparse.ArgumentParser(description="Check decorator import cost.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory(prefix="import-budget-") as pycache:
+        for module in MODULES:
+            # untimed warm-up compiles the bytecode the timed runs load
+            measure(module, pycache)
+            # best of N filters out scheduler and disk-cache noise
+            runs = [measure(module, pycache) for _ in range(args.repeat)]
+            result = min(runs, key=lambda r: r["ms"])
+            result["created_logs"] = any(r["created_logs"] for r in runs)
+            print(f"{module:<28} {result['ms']:>7.2f} ms")
+            if result["ms"] > args.budget_ms:
+                failures.append(f"{module}: {result['ms']:.2f} ms > {args.budget_ms} ms")
+            if result["created_logs"]:
+                failures.append(f"{module}: created a logs/ directory at import")
+            if result["root_handlers"]:
+                failures.append(f"{module}: configured the root logger at import")
+            if result["threads"] > 1:
+                failures.append(f"{module}: started a thread at import")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Index advisor for the queries this project actually runs.
+
+Collects query shapes from the places that already see them:
+
+- the decorators' metrics registry, live (`registry`) or dumped to JSON
+  (`query_metrics.py`'s `MetricsRegistry.dump`),
+- the JSON lines written by `log_queries`,
+- `ExecuteQuery` log lines ("Executed query: ... | Params: ..."), or live,
+  by passing `advisor.sink` as an `ExecuteQuery` sink.
+
+Each fingerprint is run through `EXPLAIN QUERY PLAN` with NULL bound to
+every parameter (plans do not depend on the values). Plan steps that scan a
+whole table are flagged, and for each one the advisor proposes an index:
+equality columns first, then one range column, then ORDER BY columns, and,
+when the query names few enough columns, a covering variant that also holds
+the selected ones.
+
+With `--benchmark`, each proposal is created on a copy of the database
+(taken with `Connection.backup`) and timed against the unindexed copy,
+using parameters recorded with the query. Proposals that are not faster
+than the unindexed copy are dropped and reported as rejected. The live
+database is never modified.
+
+The SQL analysis is a heuristic for the simple single-table statements used
+here; it does not parse joins or subqueries in general.
+
+Usage:
+    python index_advisor.py users.db --metrics metrics.json
+    python index_advisor.py users.db --log logs/2025-11-08/query.log --benchmark
+    python index_advisor.py users.db --query "SELECT * FROM users WHERE age > 40"
+"""
+
+import os
+import re
+import ast
+import json
+import time
+import sqlite3
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from db_decorators.pool import read_only_uri
+from query_metrics import MetricsRegistry, fingerprint
+
+# Sample parameter sets kept per fingerprint for benchmarking
+MAX_SAMPLES = 3
+
+# Most extra columns a covering index may carry beyond its key
+MAX_COVERING_EXTRA = 3
+
+_EXECUTE_QUERY_LINE = re.compile(
+    r"Executed query: (?P<query>.*) \| Params: (?P<params>.*)$"
+)
+_TABLE_REF = re.compile(
+    r"\b(?:FROM|JOIN)\s+[\"`\[]?(?P<table>\w+)[\"`\]]?"
+    r"(?:\s+(?:AS\s+)?(?P<alias>(?!WHERE|JOIN|ON|ORDER|GROUP|LIMIT|INNER|LEFT|CROSS)\w+))?",
+    re.IGNORECASE,
+)
+_CLAUSE_END = r"(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bHAVING\b|$)"
+_WHERE = re.compile(
+    r"\bWHERE\b(?P<where>.*?)" + _CLAUSE_END, re.IGNORECASE | re.DOTALL
+)
+_ORDER_BY = re.compile(
+    r"\bORDER\s+BY\b(?P<order>.*?)(?=\bLIMIT\b|$)", re.IGNORECASE | re.DOTALL
+)
+_SELECT_LIST = re.compile(
+    r"^\s*SELECT\s+(?:DISTINCT\s+)?(?P<cols>.*?)\s+FROM\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+# -------------------------------
+# Collected queries
+# -------------------------------
+class QueryProfile:
+    """Everything seen for one fingerprint."""
+
+    def __init__(self, shape: str) -> None:
+        self.fingerprint = shape
+        self.calls = 0
+        self.seconds = 0.0
+        self.samples: List[Tuple[str, Sequence[Any]]] = []
+
+    def add(
+        self,
+        query: Optional[str],
+        params: Optional[Sequence[Any]],
+        seconds: float,
+        calls: int = 1,
+    ) -> None:
+        self.calls += calls
+        self.seconds += seconds
+        if query is not None and len(self.samples) < MAX_SAMPLES:
+            self.samples.append((query, tuple(params or ())))
+
+
+class IndexProposal:
+    """A candidate index for one table."""
+
+    def __init__(
+        self, table: str, key: Sequence[str], include: Sequence[str] = ()
+    ) -> None:
+        self.table = table
+        self.key = list(key)
+        self.include = list(include)
+
+    @property
+    def columns(self) -> List[str]:
+        return self.key + self.include
+
+    @property
+    def covering(self) -> bool:
+        return bool(self.include)
+
+    @property
+    def name(self) -> str:
+        return f"idx_{self.table}_{'_'.join(self.columns)}"
+
+    def statement(self) -> str:
+        cols = ", ".join(self.columns)
+        return (
+            f"CREATE INDEX IF NOT EXISTS {self.name} ON {self.table} ({cols})"
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, IndexProposal) and (
+            self.table,
+            self.columns,
+        ) == (other.table, other.columns)
+
+    def __hash__(self) -> int:
+        return hash((self.table, tuple(self.columns)))
+
+
+class Finding:
+    """Plan and proposals for one query shape."""
+
+    def __init__(self, profile: QueryProfile, plan: List[str]) -> None:
+        self.profile = profile
+        self.plan = plan
+        self.scans: List[str] = []
+        self.proposals: List[IndexProposal] = []
+        self.error: Optional[str] = None
+        self.benchmarks: List[Dict[str, Any]] = []
+
+
+# -------------------------------
+# Advisor
+# -------------------------------
+class IndexAdvisor:
+    """
+    Gathers query fingerprints and proposes indexes for full table scans.
+
+    Args:
+        db_path (str): Database the queries run against.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self.profiles: Dict[str, QueryProfile] = {}
+
+    # ---- collection ---------------------------------------------------
+    def add(
+        self,
+        query: str,
+        params: Optional[Sequence[Any]] = None,
+        seconds: float = 0.0,
+        calls: int = 1,
+        sample: bool = True,
+    ) -> None:
+        """Record one (or `calls`) executions of `query`."""
+        shape = fingerprint(query)
+        profile = self.profiles.get(shape)
+        if profile is None:
+            profile = self.profiles[shape] = QueryProfile(shape)
+        profile.add(query if sample else None, params, seconds, calls)
+
+    def sink(self, stats: Any) -> None:
+        """`ExecuteQuery` sink: record the query, its parameters and timing."""
+        self.add(stats.query, stats.params, stats.total_seconds)
+
+    def load_registry(self, registry: MetricsRegistry) -> None:
+        """Add every fingerprint in a decorator metrics registry."""
+        for shape, stats in registry.items():
+            hist = stats.histogram
+            self.add(
+                shape,
+                seconds=hist.sum_us / 1_000_000,
+                calls=hist.total,
+                sample=False,
+            )
+
+    def load_log(self, path: str) -> None:
+        """Add queries from `log_queries` JSON lines and `ExecuteQuery` logs."""
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("{"):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    shape = record.get("fingerprint")
+                    if shape:
+                        seconds = (record.get("duration_ms") or 0) / 1000
+                        self.add(shape, seconds=seconds, sample=False)
+                    continue
+                match = _EXECUTE_QUERY_LINE.search(line)
+                if match:
+                    try:
+                        params = ast.literal_eval(match["params"])
+                    except (ValueError, SyntaxError):
+                        params = None
+                    if params is not None and not isinstance(
+                        params, (tuple, list)
+                    ):
+                        params = (params,)
+                    self.add(match["query"], params)
+
+    # ---- analysis -----------------------------------------------------
+    @staticmethod
+    def _explainable(shape: str) -> str:
+        return shape.replace("IN (?+)", "IN (?)")
+
+    def explain(self, conn: sqlite3.Connection, shape: str) -> List[str]:
+        """Return the `EXPLAIN QUERY PLAN` details for a fingerprint."""
+        sql = self._explainable(shape)
+        # Fingerprints hold no string literals, so every "?" is a parameter
+        nulls = [None] * sql.count("?")
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", nulls).fetchall()
+        return [detail for *_, detail in rows]
+
+    def analyze(self) -> List[Finding]:
+        """Explain every collected query; propose indexes for table scans."""
+        conn = sqlite3.connect(read_only_uri(self.db_path), uri=True)
+        findings = []
+        try:
+            tables = {
+                name.lower(): name
+                for (name,) in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )
+            }
+            ordered = sorted(
+                self.profiles.values(), key=lambda p: p.seconds, reverse=True
+            )
+            for profile in ordered:
+                try:
+                    plan = self.explain(conn, profile.fingerprint)
+                except sqlite3.Error as e:
+                    finding = Finding(profile, [])
+                    finding.error = str(e)
+                    findings.append(finding)
+                    continue
+                finding = Finding(profile, plan)
+                aliases = _table_aliases(profile.fingerprint, tables)
+                for step in plan:
+                    table = _scanned_table(step, aliases)
+                    if table is None:
+                        continue
+                    finding.scans.append(step)
+                    for proposal in _propose(conn, profile.fingerprint, table):
+                        if proposal not in finding.proposals:
+                            finding.proposals.append(proposal)
+                findings.append(finding)
+        finally:
+            conn.close()
+        return findings
+
+    # ---- benchmarking -------------------------------------------------
+    def benchmark(self, findings: Iterable[Finding], repeat: int = 5) -> None:
+        """
+        Time each proposal on a private copy of the database.
+
+        Results are stored on each finding's `benchmarks`, and proposals
+        with a speedup of 1 or less are removed from its `proposals`.
+        Findings without recorded parameters are skipped: timing with NULLs
+        would measure an empty result.
+        """
+        todo = [f for f in findings if f.proposals and f.profile.samples]
+        if not todo:
+            return
+        with tempfile.TemporaryDirectory() as tmp:
+            copy_path = os.path.join(tmp, "advisor_copy.db")
+            src = sqlite3.connect(read_only_uri(self.db_path), uri=True)
+            copy = sqlite3.connect(copy_path)
+            try:
+                src.backup(copy)
+            finally:
+                src.close()
+            try:
+                for finding in todo:
+                    query, params = finding.profile.samples[0]
+                    before = _time_query(copy, query, params, repeat)
+                    kept = []
+                    for proposal in finding.proposals:
+                        copy.execute(proposal.statement())
+                        after = _time_query(copy, query, params, repeat)
+                        plan = [
+                            d
+                            for *_, d in copy.execute(
+                                f"EXPLAIN QUERY PLAN {query}", params
+                            )
+                        ]
+                        copy.execute(f"DROP INDEX {proposal.name}")
+                        speedup = before / after if after else None
+                        helps = speedup is None or speedup > 1
+                        if helps:
+                            kept.append(proposal)
+                        finding.benchmarks.append(
+                            {
+                                "index": proposal.statement(),
+                                "before_ms": round(before * 1000, 3),
+                                "after_ms": round(after * 1000, 3),
+                                "speedup": round(speedup, 2)
+                                if speedup is not None
+                                else None,
+                                "rejected": not helps,
+                                "plan": plan,
+                            }
+                        )
+                    finding.proposals = kept
+            finally:
+                copy.close()
+
+
+# -------------------------------
+# SQL heuristics
+# -------------------------------
+def _scanned_table(step: str, aliases: Dict[str, str]) -> Optional[str]:
+    """
+    Return the table a full-scan plan step reads, or None.
+
+    SQLite 3.36 and later print `SCAN <table>`; older versions print
+    `SCAN TABLE <table>`. Scans that use an index are not full scans.
+    """
+    parts = step.split()
+    if len(parts) < 2 or parts[0] != "SCAN" or "USING" in parts:
+        return None
+    name = parts[1]
+    if name == "TABLE" and len(parts) > 2:
+        name = parts[2]
+    return aliases.get(name.lower())
+
+
+def _table_aliases(sql: str, tables: Dict[str, str]) -> Dict[str, str]:
+    """Map each table name and alias in FROM/JOIN to its real table name."""
+    aliases = {}
+    for match in _TABLE_REF.finditer(sql):
+        table = tables.get(match["table"].lower())
+        if table is None:
+            continue
+        aliases[table.lower()] = table
+        if match["alias"]:
+            aliases[match["alias"].lower()] = table
+    return aliases
+
+
+def _mentioned(text: str, columns: Sequence[str]) -> List[str]:
+    """Columns of `columns` that appear in `text`, in order of appearance."""
+    found = []
+    for m in re.finditer(r"\b(\w+)\b", text):
+        for col in columns:
+            if m.group(1).lower() == col.lower() and col not in found:
+                found.append(col)
+    return found
+
+
+def _propose(
+    conn: sqlite3.Connection, sql: str, table: str
+) -> List[IndexProposal]:
+    """Propose a key index and, if small enough, a covering one."""
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    columns = [row[1] for row in info]
+    rowid_alias = [
+        row[1] for row in info if row[5] and row[2].upper() == "INTEGER"
+    ]
+
+    where = _WHERE.search(sql)
+    where_text = where["where"] if where else ""
+    equality, ranges = [], []
+    for col in columns:
+        ref = rf"\b(?:\w+\.)?{re.escape(col)}\s*"
+        if re.search(
+            ref + r"(?:==?|\bIS\b|\bIN\b)", where_text, re.IGNORECASE
+        ):
+            equality.append(col)
+        elif re.search(
+            ref + r"(?:<|>|\bBETWEEN\b|\bLIKE\b|\bGLOB\b)",
+            where_text,
+            re.IGNORECASE,
+        ):
+            ranges.append(col)
+
+    order = _ORDER_BY.search(sql)
+    order_cols = _mentioned(order["order"], columns) if order else []
+
+    key = [c for c in equality if c not in rowid_alias]
+    if ranges:
+        key.append(ranges[0])
+    elif order_cols:
+        key += [c for c in order_cols if c not in key]
+    key = [c for c in key if c not in rowid_alias]
+    if not key:
+        return []
+    proposals = [IndexProposal(table, key)]
+
+    select = _SELECT_LIST.search(sql)
+    cols_text = select["cols"] if select else "*"
+    selected = (
+        columns
+        if re.search(r"(^|[\s,.])\*", cols_text)
+        else _mentioned(cols_text, columns)
+    )
+    referenced = selected + _mentioned(where_text, columns) + order_cols
+    extra = [
+        c
+        for c in dict.fromkeys(referenced)
+        if c not in key and c not in rowid_alias
+    ]
+    if extra and len(extra) <= MAX_COVERING_EXTRA:
+        proposals.append(IndexProposal(table, key, extra))
+    return proposals
+
+
+def _time_query(
+    conn: sqlite3.Connection, query: str, params: Sequence[Any], repeat: int
+) -> float:
+    """Best-of-`repeat` seconds to run `query` and fetch every row."""
+    conn.execute(query, params).fetchall()  # warm the page cache
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+# -------------------------------
+# Report
+# -------------------------------
+def report(findings: Sequence[Finding]) -> str:
+    """Render findings as plain text, most expensive queries first."""
+    lines = []
+    for finding in findings:
+        profile = finding.profile
+        if not (finding.scans or finding.error):
+            continue
+        lines.append(f"{profile.fingerprint}")
+        lines.append(
+            f"  calls={profile.calls} total={profile.seconds * 1000:.1f} ms"
+        )
+        if finding.error:
+            lines.append(f"  could not explain: {finding.error}")
+        for step in finding.scans:
+            lines.append(f"  full scan: {step}")
+        for proposal in finding.proposals:
+            kind = "covering" if proposal.covering else "index"
+            lines.append(f"  propose ({kind}): {proposal.statement()}")
+        for bench in finding.benchmarks:
+            verdict = " REJECTED, no speedup" if bench["rejected"] else ""
+            lines.append(
+                f"  benchmark: {bench['before_ms']:.1f} ms -> {bench['after_ms']:.1f} ms "
+                f"(x{bench['speedup']}{verdict}) with {bench['index']}"
+            )
+        lines.append("")
+    return "\n".join(lines) if lines else "No full table scans found."
+
+
+# -------------------------------
+# CLI
+# -------------------------------
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    """Collect queries, print findings and (optionally) benchmarks."""
+    import argparse  # CLI-only; keeps library imports cheap
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("db", help="database the queries run against")
+    parser.add_argument(
+        "--metrics", action="append", default=[], help="metrics JSON dump"
+    )
+    parser.add_argument(
+        "--log", action="append", default=[], help="query or ExecuteQuery log"
+    )
+    parser.add_argument(
+        "--query", action="append", default=[], help="a query to check"
+    )
+    parser.add_argument(
+        "--benchmark", action="store_true", help="time proposals on a copy"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    advisor = IndexAdvisor(args.db)
+    for path in args.metrics:
+        advisor.load_registry(MetricsRegistry.load(path))
+    for path in args.log:
+        advisor.load_log(path)
+    for query in args.query:
+        advisor.add(query)
+    findings = advisor.analyze()
+    if args.benchmark:
+        advisor.benchmark(findings, args.repeat)
+    print(report(findings))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Query fingerprinting and latency histograms for decorated DB calls.
+
+The decorators feed a process-wide `registry` keyed by query fingerprint
+(SQL with literals stripped and IN-lists collapsed). Each fingerprint keeps
+an HDR-style log-linear latency histogram plus call and error counts, which
+can be exported in Prometheus text format or printed as a report.
+
+Usage:
+    python query_metrics.py report metrics.json
+    python query_metrics.py report metrics.json --format prometheus
+"""
+
+import re
+import sys
+import json
+import atexit
+import functools
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# -------------------------------
+# Fingerprinting
+# -------------------------------
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_BLOB = re.compile(r"\b[xX]'[0-9a-fA-F]*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(query: str) -> str:
+    """
+    Normalize a SQL statement into its query shape.
+
+    String, blob and numeric literals become `?`, IN-lists of any length
+    collapse to `IN (?+)`, and whitespace is squeezed to single spaces.
+
+    Args:
+        query (str): The raw SQL text.
+
+    Returns:
+        str: The normalized fingerprint.
+    """
+    shape = _BLOB.sub("?", query)
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?+)", shape)
+    return _WHITESPACE.sub(" ", shape).strip().rstrip(";")
+
+
+# -------------------------------
+# HDR-style histogram
+# -------------------------------
+
+# 16 linear sub-buckets per power of two keeps relative error under ~6%
+SUB_BUCKET_BITS = 4
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_LINEAR_LIMIT = _SUB_BUCKETS * 2
+
+
+def _bucket_index(value: int) -> int:
+    """Map a non-negative integer to its log-linear bucket."""
+    if value < _LINEAR_LIMIT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * _SUB_BUCKETS + (value >> shift)
+
+
+def _bucket_bounds(index: int) -> Tuple[int, int]:
+    """Return the inclusive (low, high) values covered by a bucket."""
+    if index < _LINEAR_LIMIT:
+        return index, index
+    shift = index // _SUB_BUCKETS - 1
+    low = (index % _SUB_BUCKETS + _SUB_BUCKETS) << shift
+    return low, low + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    Sparse log-linear histogram of latencies in microseconds.
+
+    Recording is O(1) and memory grows with the number of distinct
+    buckets touched, not with the number of samples.
+    """
+
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    def record(self, micros: int) -> None:
+        """Add one latency sample, in microseconds."""
+        micros = max(0, micros)
+        index = _bucket_index(micros)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum_us += micros
+        if self.min_us is None or micros < self.min_us:
+            self.min_us = micros
+        if micros > self.max_us:
+            self.max_us = micros
+
+    def percentile(self, pct: float) -> int:
+        """
+        Return the latency at percentile `pct` (0-100), in microseconds.
+
+        The value reported is the upper bound of the bucket holding the
+        requested rank, clamped to the observed maximum.
+        """
+        if not self.total:
+            return 0
+        rank = max(1, round(self.total * pct / 100.0))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_bounds(index)[1], self.max_us)
+        return self.max_us
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for JSON dumps."""
+        return {
+            "counts": {str(k): v for k, v in self.counts.items()},
+            "total": self.total,
+            "sum_us": self.sum_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        """Rebuild a histogram produced by `to_dict`."""
+        hist = cls()
+        hist.counts = {int(k): v for k, v in data["counts"].items()}
+        hist.total = data["total"]
+        hist.sum_us = data["sum_us"]
+        hist.min_us = data["min_us"]
+        hist.max_us = data["max_us"]
+        return hist
+
+
+# -------------------------------
+# Registry
+# -------------------------------
+class QueryStats:
+    """Latency histogram and error count for one fingerprint."""
+
+    def __init__(self) -> None:
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+
+
+class MetricsRegistry:
+    """Thread-safe map of fingerprint -> QueryStats."""
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, QueryStats] = {}
+
+    def record(self, query: str, seconds: float, error: bool = False) -> None:
+        """
+        Record one execution of `query`.
+
+        Args:
+            query (str): Raw SQL; fingerprinted before storage.
+            seconds (float): Wall-clock duration of the call.
+            error (bool): Whether the call raised.
+        """
+        key = fingerprint(query)
+        micros = int(seconds * 1_000_000)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats()
+            stats.histogram.record(micros)
+            if error:
+                stats.errors += 1
+
+    def reset(self) -> None:
+        """Drop all recorded data."""
+        with self._lock:
+            self._stats.clear()
+
+    def items(self) -> List[Tuple[str, QueryStats]]:
+        """Return a stable snapshot of (fingerprint, stats) pairs."""
+        with self._lock:
+            return sorted(self._stats.items())
+
+    # ---- export -------------------------------------------------------
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP db_query_duration_seconds Latency of decorated DB queries.",
+            "# TYPE db_query_duration_seconds summary",
+        ]
+        errors = [
+            "# HELP db_query_errors_total Failed executions per query shape.",
+            "# TYPE db_query_errors_total counter",
+        ]
+        for key, stats in self.items():
+            label = _escape_label(key)
+            hist = stats.histogram
+            for q in self.QUANTILES:
+                value = hist.percentile(q * 100) / 1_000_000
+                lines.append(
+                    f'db_query_duration_seconds{{fingerprint="{label}",'
+                    f'quantile="{q}"}} {value:.6f}'
+                )
+            lines.append(
+                f'db_query_duration_seconds_sum{{fingerprint="{label}"}} '
+                f"{hist.sum_us / 1_000_000:.6f}"
+            )
+            lines.append(
+                f'db_query_duration_seconds_count{{fingerprint="{label}"}} '
+                f"{hist.total}"
+            )
+            errors.append(
+                f'db_query_errors_total{{fingerprint="{label}"}} {stats.errors}'
+            )
+        return "\n".join(lines + errors) + "\n"
+
+    def report(self) -> str:
+        """Render a plain-text table sorted by p99 latency, slowest first."""
+        rows = sorted(
+            self.items(), key=lambda kv: kv[1].histogram.percentile(99), reverse=True
+        )
+        header = (
+            f"{'calls':>8} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9} "
+            f"{'max ms':>9}  query"
+        )
+        lines = [header, "-" * len(header)]
+        for key, stats in rows:
+            hist = stats.histogram
+            lines.append(
+                f"{hist.total:>8} {stats.errors:>7} "
+                f"{hist.percentile(50) / 1000:>9.3f} "
+                f"{hist.percentile(99) / 1000:>9.3f} "
+                f"{hist.max_us / 1000:>9.3f}  {key}"
+            )
+        return "\n".join(lines)
+
+    # ---- persistence --------------------------------------------------
+    def dump(self, path: str) -> None:
+        """Write all stats to `path` as JSON for later reporting."""
+        data = {
+            key: {"errors": stats.errors, "histogram": stats.histogram.to_dict()}
+            for key, stats in self.items()
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    def dump_at_exit(self, path: str) -> None:
+        """Register a JSON dump of the registry when the process exits."""
+        atexit.register(self.dump, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MetricsRegistry":
+        """Read a registry previously written by `dump`."""
+        registry = cls()
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for key, entry in data.items():
+            stats = QueryStats()
+            stats.errors = entry["errors"]
+            stats.histogram = LatencyHistogram.from_dict(entry["histogram"])
+            registry._stats[key] = stats
+        return registry
+
+
+def _escape_label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Shared by every decorator in this project
+registry = MetricsRegistry()
+
+
+# -------------------------------
+# CLI
+# -------------------------------
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    """Print a report for a metrics dump."""
+    import argparse  # CLI-only; keeps library imports cheap
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="print metrics from a JSON dump")
+    report.add_argument("path")
+    report.add_argument("--format", choices=("text", "prometheus"), default="text")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    loaded = MetricsRegistry.load(args.path)
+    if args.format == "prometheus":
+        sys.stdout.write(loaded.to_prometheus())
+    else:
+        print(loaded.report())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
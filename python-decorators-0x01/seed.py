@@ -1,9 +1,13 @@
 import os
 import csv
+import time
 import uuid
+import random
 import sqlite3
+import itertools
 from pathlib import Path
 from sqlite3 import Error, Connection, IntegrityError
+from typing import Iterable, Iterator, Optional, Tuple
 
 # -------------------------
 # Database Connection Setup
@@ -79,6 +83,139 @@ def insert_data(connection: Connection, csv_file: Path):
         print(f"❌ Error inserting data: {err}")
 
 
+# -------------------------
+# Bulk Loading
+# -------------------------
+
+UserRow = Tuple[str, str, str, int]
+
+# Same columns as `create_table`; email uniqueness comes from LOAD_INDEXES
+BULK_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id CHAR(36) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    age DECIMAL NOT NULL
+)
+"""
+
+# Built before the load so INSERT OR IGNORE skips colliding emails; building
+# it afterwards would fail on a duplicate and roll back the whole load
+LOAD_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email)",
+)
+
+# Trade durability for speed while loading; a crash means re-running the seed
+LOAD_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",  # 256 MiB
+)
+AFTER_LOAD_PRAGMAS = ("PRAGMA synchronous = NORMAL",)
+
+
+def csv_users(csv_file: Path) -> Iterator[UserRow]:
+    """Yield users from the CSV, skipping emails already seen."""
+    seen = set()
+    with open(csv_file, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            email = row["email"]
+            if email in seen:
+                continue
+            seen.add(email)
+            yield str(uuid.uuid4()), row["name"], email, int(row["age"])
+
+
+def synthetic_users(count: int, seed: int = 0) -> Iterator[UserRow]:
+    """
+    Yield `count` distinct synthetic users, reproducibly for a given seed.
+
+    IDs are UUID-shaped but increase monotonically, so inserts append to the
+    primary-key index instead of splitting pages at random like uuid4 would.
+    Emails include the seed, so loads with different seeds do not collide.
+    """
+    rng = random.Random(seed)
+    prefix = f"{seed & 0xFFFFFFFF:08x}-0000-4000-8000-"
+    ages = range(18, 100)
+    # Build columns a block at a time; per-row Python work dominates the load
+    for start in range(0, count, 10_000):
+        block = range(start, min(start + 10_000, count))
+        yield from zip(
+            [f"{prefix}{n:012x}" for n in block],
+            [f"User {n}" for n in block],
+            [f"user{seed}_{n}@example.com" for n in block],
+            rng.choices(ages, k=len(block)),
+        )
+
+
+def bulk_insert(
+    connection: Connection, rows: Iterable[UserRow], batch_size: int = 50_000
+) -> int:
+    """
+    Load `rows` into users with `executemany` inside a single transaction.
+
+    The table and its unique email index are created first if missing, so
+    rows whose ID or email already exists are skipped rather than failing
+    the load. Returns the number of rows inserted.
+    """
+    for pragma in LOAD_PRAGMAS:
+        connection.execute(pragma)
+    connection.execute(BULK_TABLE_QUERY)
+    for index in LOAD_INDEXES:
+        connection.execute(index)
+    before = connection.total_changes
+    rows = iter(rows)
+    try:
+        with connection:
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                connection.executemany(
+                    "INSERT OR IGNORE INTO users (user_id, name, email, age) "
+                    "VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+            inserted = connection.total_changes - before
+    finally:
+        for pragma in AFTER_LOAD_PRAGMAS:
+            connection.execute(pragma)
+    return inserted
+
+
+def seed(
+    db_path: Path = db,
+    csv_file: Optional[Path] = None,
+    synthetic: int = 0,
+    random_seed: int = 0,
+    batch_size: int = 50_000,
+) -> int:
+    """Bulk-load the CSV and/or `synthetic` generated users into `db_path`."""
+    conn = connect_db(db_path)
+    if conn is None:
+        return 0
+    sources = []
+    if csv_file is not None:
+        sources.append(csv_users(csv_file))
+    if synthetic:
+        sources.append(synthetic_users(synthetic, random_seed))
+    started = time.perf_counter()
+    try:
+        inserted = bulk_insert(conn, itertools.chain(*sources), batch_size)
+    except Error as err:
+        print(f"❌ Error bulk loading data: {err}")
+        return 0
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Loaded {inserted:,} users into {db_path} in {elapsed:.2f}s "
+        f"({inserted / max(elapsed, 1e-9):,.0f} rows/s)"
+    )
+    return inserted
+
+
 # Seed data
 
 # -------------------------
@@ -107,13 +244,33 @@ def stream_rows(connection: Connection, batch_size: int = 100):
 # -------------------------
 
 if __name__ == "__main__":
-    conn = connect_db(db)
-    if conn:
-        create_table(conn)
-        insert_data(
-            conn, Path(os.path.join(WD, "../python-generators-0x00/user_data.csv"))
-        )
+    import argparse
 
+    parser = argparse.ArgumentParser(description="Seed the users table.")
+    parser.add_argument("--db", type=Path, default=db)
+    parser.add_argument(
+        "--csv",
+        type=Path,
+        default=Path(os.path.join(WD, "../python-generators-0x00/user_data.csv")),
+    )
+    parser.add_argument("--no-csv", action="store_true", help="skip the CSV")
+    parser.add_argument(
+        "--synthetic", type=int, default=0, help="also generate N synthetic users"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    seed(
+        args.db,
+        None if args.no_csv else args.csv,
+        synthetic=args.synthetic,
+        random_seed=args.seed,
+        batch_size=args.batch_size,
+    )
+
+    conn = connect_db(args.db)
+    if conn:
         print("✅ Streaming first 5 rows using generator:")
         row_gen = stream_rows(conn)
         for i, row in enumerate(row_gen):
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Behavior tests for db_decorators.circuit.
+
+Covers the closed -> open -> half-open -> closed cycle, what counts as a
+failure, the half-open probe slot given back by a cancelled probe, and
+the shared registry's handling of conflicting settings.
+"""
+
+import asyncio
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+from db_decorators import circuit
+from db_decorators.circuit import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    get_breaker,
+)
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to."""
+
+    def __init__(self) -> None:
+        """Start the clock at an arbitrary non-zero time."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Return the current fake time."""
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """State transitions of a single CircuitBreaker."""
+
+    def setUp(self) -> None:
+        """Patch the breaker's clock and build a small breaker."""
+        self.clock = FakeClock()
+        patcher = patch.object(circuit.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(
+            "test.db", failure_rate=0.5, min_calls=4, reset_timeout=5.0
+        )
+
+    def fail(self, times: int = 1) -> None:
+        """Record `times` operational failures."""
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.on_failure(sqlite3.OperationalError("locked"))
+
+    def trip(self) -> None:
+        """Open the breaker and wait out its reset timeout."""
+        self.fail(4)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now += 5.0
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+    def test_opens_at_failure_rate_after_min_calls(self) -> None:
+        """It stays closed below min_calls and opens once the rate is hit."""
+        self.fail(3)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.before_call()
+        self.breaker.on_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.trips, 1)
+
+    def test_open_rejects_calls(self) -> None:
+        """While open, calls fail fast with CircuitOpenError."""
+        self.fail(4)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.assertEqual(self.breaker.rejected, 1)
+
+    def test_successful_probe_closes(self) -> None:
+        """A successful half-open probe closes the circuit and clears the window."""
+        self.trip()
+        self.breaker.before_call()
+        self.breaker.on_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.snapshot()["window_calls"], 0)
+
+    def test_failed_probe_reopens(self) -> None:
+        """A failed half-open probe opens the circuit again."""
+        self.trip()
+        self.fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.trips, 2)
+
+    def test_half_open_limits_probes(self) -> None:
+        """Only half_open_calls probes are let through at once."""
+        self.trip()
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_cancelled_probe_frees_slot(self) -> None:
+        """A cancelled probe leaves the state alone and frees its slot."""
+        self.trip()
+        self.breaker.before_call()
+        self.breaker.on_failure(asyncio.CancelledError())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertEqual(self.breaker._probes, 0)
+        # The freed slot lets the next probe through, which closes it
+        self.breaker.before_call()
+        self.breaker.on_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_base_exceptions_do_not_count(self) -> None:
+        """KeyboardInterrupt and friends are neither failures nor successes."""
+        self.fail(3)
+        self.breaker.before_call()
+        self.breaker.on_failure(KeyboardInterrupt())
+        self.assertEqual(self.breaker.snapshot()["window_calls"], 3)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_unclassified_errors_count_as_successes(self) -> None:
+        """Errors the classifier rejects say the database is healthy."""
+        self.fail(2)
+        for _ in range(2):
+            self.breaker.before_call()
+            self.breaker.on_failure(ValueError("bad input"))
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.snapshot()["window_failures"], 2)
+
+    def test_decorator_async_cancellation(self) -> None:
+        """A cancelled coroutine probe does not reopen or close the circuit."""
+        self.trip()
+
+        @self.breaker
+        async def query() -> None:
+            raise asyncio.CancelledError()
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(query())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertEqual(self.breaker._probes, 0)
+
+
+class TestGetBreaker(unittest.TestCase):
+    """The process-wide breaker registry."""
+
+    def setUp(self) -> None:
+        """Give each test an empty registry."""
+        patcher = patch.dict(circuit._breakers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_same_name_shares_breaker(self) -> None:
+        """Lookups with no or matching settings return the same breaker."""
+        breaker = get_breaker("shared.db", min_calls=3)
+        self.assertIs(get_breaker("shared.db"), breaker)
+        self.assertIs(get_breaker("shared.db", min_calls=3), breaker)
+
+    def test_conflicting_settings_raise(self) -> None:
+        """Settings that differ from the registered breaker are refused."""
+        get_breaker("shared.db", min_calls=3)
+        with self.assertRaisesRegex(ValueError, "min_calls=3, got 4"):
+            get_breaker("shared.db", min_calls=4)
+
+
+if __name__ == "__main__":
+    unittest.main()